@@ -0,0 +1,178 @@
+import asyncio
+import threading
+import time
+from slack_sdk.errors import SlackApiError
+from github_handlers import parse_pr_title
+from utils import logger
+from views import build_approval_digest_message
+from warm_state import TtlCache, snapshot
+
+
+class _Batch:
+    def __init__(self, team_name, now):
+        self.team_name = team_name
+        # Held while posting or updating, so a post always finishes before its update
+        self.flush_lock = asyncio.Lock()
+        self.approvals = {}
+        self.ts = None
+        self.flush_scheduled = False
+        self.updated_at = now
+
+
+class _DigestBatches:
+    """Per-team approval digests shared by the sync and async digests.
+
+    Each team's approvals are collected into one digest message. Approvals
+    arriving while the batch was last updated less than `batch_ttl` seconds ago
+    update that same message instead of posting a new one, and the message is
+    posted or updated at most once every `window` seconds.
+    """
+
+    def __init__(self, slack_client, slack_channel, window, batch_ttl):
+        self.slack_client = slack_client
+        self.slack_channel = slack_channel
+        self.window = window
+        self.batch_ttl = batch_ttl
+        self.approvals_received = 0
+        self.slack_calls = 0
+
+    def _log_flush(self, team_name, approvals, updated):
+        self.slack_calls += 1
+        action = "Updated" if updated else "Posted"
+        logger.info(f"{action} approval digest for team {team_name} with {len(approvals)} approval(s) "
+                    f"({self.slack_calls} Slack calls for {self.approvals_received} approvals)")
+
+
+class ApprovalDigest(_DigestBatches):
+    """Digest for the WSGI/Lambda entry point, sent on the request path.
+
+    A Lambda container is frozen once the response is returned, so nothing can
+    wait on a timer. The first approval posts the team's digest at once; an
+    approval arriving less than `window` seconds after the last send is only
+    saved with its batch in the warm-state snapshot, and `send_due()`, run at
+    the end of every request, sends it once the window has passed.
+    """
+
+    def __init__(self, slack_client, slack_channel, window, batch_ttl, store=snapshot):
+        super().__init__(slack_client, slack_channel, window, batch_ttl)
+        # team -> {"ts", "approvals", "sent_at", "pending"}, restored on a warm start
+        self._batches = TtlCache("approval_digests", batch_ttl, store=store)
+        self._lock = threading.Lock()
+        # team -> lock held while posting or updating, so a post always finishes before its update
+        self._flush_locks = {}
+
+    def add(self, approval, send_single):
+        """Add an approval to its team's digest; PRs not created by this bot fall back to send_single(approval)."""
+        parsed = parse_pr_title(approval["pr_title"])
+        if parsed is None:
+            send_single(approval)
+            return
+
+        team_name = parsed[0]
+        with self._lock:
+            self.approvals_received += 1
+            batch = self._batches.get(team_name) or {"ts": None, "approvals": [], "sent_at": None, "pending": False}
+            # Keyed by PR so a re-approval replaces rather than duplicates the line
+            approvals = [a for a in batch["approvals"] if a["pr_number"] != approval["pr_number"]]
+            # Batches are replaced, never changed in place, as the snapshot may be serialising the old one
+            self._batches.set(team_name, {**batch, "approvals": approvals + [approval], "pending": True})
+        self._send(team_name)
+
+    def send_due(self):
+        """Send the held-back approvals of every team whose window has passed."""
+        for team_name in self._batches.keys():
+            self._send(team_name)
+
+    def _send(self, team_name):
+        with self._lock:
+            flush_lock = self._flush_locks.setdefault(team_name, threading.Lock())
+        with flush_lock:
+            with self._lock:
+                batch = self._batches.get(team_name)
+                if batch is None or not batch["pending"]:
+                    # Nothing new, or a concurrent request already sent it
+                    return
+                now = time.time()
+                if batch["ts"] is not None and now - batch["sent_at"] < self.window:
+                    return
+                self._batches.set(team_name, {**batch, "pending": False, "sent_at": now})
+
+            approvals = batch["approvals"]
+            message = build_approval_digest_message(team_name, approvals)
+            try:
+                if batch["ts"] is None:
+                    response = self.slack_client.chat_postMessage(channel=self.slack_channel, **message)
+                    with self._lock:
+                        current = self._batches.get(team_name, batch)
+                        self._batches.set(team_name, {**current, "ts": response["ts"]})
+                    self._log_flush(team_name, approvals, updated=False)
+                else:
+                    self.slack_client.chat_update(channel=self.slack_channel, ts=batch["ts"], **message)
+                    self._log_flush(team_name, approvals, updated=True)
+            except SlackApiError as e:
+                logger.error(f"Error sending approval digest for team {team_name}: {e}")
+                # Retried by a later request once the window has passed again
+                with self._lock:
+                    current = self._batches.get(team_name, batch)
+                    self._batches.set(team_name, {**current, "pending": True})
+
+
+class AsyncApprovalDigest(_DigestBatches):
+    """Digest for the long-lived ASGI process.
+
+    Approvals for a team are buffered for `window` seconds and then sent as one
+    post or update, so a burst of approvals costs a single Slack call.
+    """
+
+    def __init__(self, slack_client, slack_channel, window, batch_ttl):
+        super().__init__(slack_client, slack_channel, window, batch_ttl)
+        self._batches = {}
+        self._tasks = set()
+
+    def _add_to_batch(self, team_name, approval):
+        now = time.monotonic()
+        batch = self._batches.get(team_name)
+        if batch is None or now - batch.updated_at > self.batch_ttl:
+            batch = self._batches[team_name] = _Batch(team_name, now)
+
+        self.approvals_received += 1
+        # Keyed by PR so a re-approval replaces rather than duplicates the line
+        batch.approvals[approval["pr_number"]] = approval
+        batch.updated_at = now
+        return batch
+
+    def _take_snapshot(self, batch):
+        batch.flush_scheduled = False
+        return list(batch.approvals.values())
+
+    async def add(self, approval, send_single):
+        """Buffer an approval; PRs not created by this bot fall back to awaiting send_single(approval)."""
+        parsed = parse_pr_title(approval["pr_title"])
+        if parsed is None:
+            await send_single(approval)
+            return
+
+        batch = self._add_to_batch(parsed[0], approval)
+        if batch.flush_scheduled:
+            return
+        batch.flush_scheduled = True
+        task = asyncio.create_task(self._flush_later(batch))
+        # Keep a reference so the task is not garbage collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush_later(self, batch):
+        await asyncio.sleep(self.window)
+        async with batch.flush_lock:
+            approvals = self._take_snapshot(batch)
+            message = build_approval_digest_message(batch.team_name, approvals)
+            try:
+                if batch.ts is None:
+                    response = await self.slack_client.chat_postMessage(channel=self.slack_channel, **message)
+                    batch.ts = response["ts"]
+                    self._log_flush(batch.team_name, approvals, updated=False)
+                else:
+                    await self.slack_client.chat_update(channel=self.slack_channel, ts=batch.ts, **message)
+                    self._log_flush(batch.team_name, approvals, updated=True)
+            except SlackApiError as e:
+                logger.error(f"Error sending approval digest for team {batch.team_name}: {e}")
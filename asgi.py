@@ -0,0 +1,117 @@
+"""Async serving mode: the same routes as main.py on an ASGI server.
+
+Run with `uvicorn asgi:app`. Slack calls go through AsyncWebClient and GitHub/Jira
+calls through aiohttp, so slow confirms no longer hold a worker each and
+/slack/team_search stays responsive. main.py remains the WSGI/Lambda entry point.
+"""
+import asyncio
+import contextlib
+import json
+import logging
+import aiohttp
+from slack_sdk.web.async_client import AsyncWebClient
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from config import (APPROVAL_DIGEST_BATCH_TTL, APPROVAL_DIGEST_WINDOW, SLACK_API_URL, SLACK_CHANNEL, SLACK_TOKEN,
+                    SNAPSHOT_FLUSH_INTERVAL, TEAM_EMAIL_LIST_TTL)
+from approval_digest import AsyncApprovalDigest
+from async_clients import AsyncGitHub, AsyncJira
+from async_handlers import get_team_folders, handle_prod_access_command, handle_slack_interactions, send_pr_approved_message
+from github_handlers import get_breakglass_approval, verify_github_signature
+from views import build_team_options
+from warm_state import TtlCache, snapshot
+
+logging.basicConfig(level=logging.INFO)
+
+# Initialize Slack Client
+slack_client = AsyncWebClient(token=SLACK_TOKEN, base_url=SLACK_API_URL)
+
+# Batches PR approvals per team into a single Slack message
+approval_digest = AsyncApprovalDigest(slack_client, SLACK_CHANNEL, APPROVAL_DIGEST_WINDOW, APPROVAL_DIGEST_BATCH_TTL)
+
+# In-flight email edits per team; kept in memory only, since they decide who gets break-glass PRs
+team_email_lists = TtlCache("team_email_lists", TEAM_EMAIL_LIST_TTL, store=None)
+clients = {}
+
+
+async def flush_warm_state_periodically():
+    # Snapshot writes are blocking file I/O, so they run in a thread rather than on the event loop
+    while True:
+        await asyncio.sleep(SNAPSHOT_FLUSH_INTERVAL)
+        await asyncio.to_thread(snapshot.flush)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    flusher = asyncio.create_task(flush_warm_state_periodically())
+    # One pooled HTTP session for GitHub and Jira for the lifetime of the process
+    async with aiohttp.ClientSession() as session:
+        clients["github"] = AsyncGitHub(session)
+        clients["jira"] = AsyncJira(session)
+        yield
+        clients.clear()
+    flusher.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await flusher
+    await asyncio.to_thread(snapshot.flush)
+
+
+async def team_search(request):
+    form = await request.form()
+    # Slack sends block_suggestion requests as a JSON "payload" form field
+    if "payload" in form:
+        payload = json.loads(form["payload"])
+    else:
+        payload = form
+    query = payload.get('value', '')
+
+    all_teams = await get_team_folders(clients["github"])
+    return JSONResponse({
+        "options": build_team_options(all_teams, query)
+    })
+
+
+async def handle_interactions(request):
+    form = await request.form()
+
+    if "payload" in form:
+        result = await handle_slack_interactions(form, slack_client, SLACK_CHANNEL, team_email_lists, clients["github"], clients["jira"])
+    elif form.get("command") == "/prod-access":
+        result = await handle_prod_access_command(form, slack_client)
+    else:
+        result = {"status": "error", "message": "Invalid request"}
+    return JSONResponse(result)
+
+
+async def github_webhook(request):
+    body = await request.body()
+    # Verify the webhook signature
+    if not verify_github_signature(request.headers.get('X-Hub-Signature-256'), body):
+        return JSONResponse({"error": "Invalid signature"}, status_code=403)
+
+    approval = get_breakglass_approval(request.headers.get('X-GitHub-Event'), json.loads(body))
+    if approval:
+        await approval_digest.add(
+            approval,
+            lambda single: send_pr_approved_message(**single, slack_client=slack_client, slack_channel=SLACK_CHANNEL)
+        )
+
+    return JSONResponse({"status": "success"})
+
+
+app = Starlette(
+    routes=[
+        Route('/slack/team_search', team_search, methods=['POST']),
+        Route('/slack/actions', handle_interactions, methods=['POST']),
+        Route('/github/webhook', github_webhook, methods=['POST']),
+    ],
+    lifespan=lifespan,
+)
+
+if __name__ == "__main__":
+    import uvicorn
+
+    print("Starting ASGI server")
+    uvicorn.run(app)
@@ -0,0 +1,97 @@
+import base64
+import aiohttp
+from config import GITHUB_API_URL, GITHUB_REPO, GITHUB_TOKEN, JIRA_API_TOKEN, JIRA_EMAIL, JIRA_SERVER
+from jira_handlers import jira_account_cache
+from utils import logger
+
+
+class AsyncGitHub:
+    """Minimal async GitHub REST client covering the calls the handlers make."""
+
+    def __init__(self, session, token=GITHUB_TOKEN, base_url=GITHUB_API_URL, repo=GITHUB_REPO):
+        if not repo:
+            raise ValueError("GITHUB_REPO is not set")
+        self.session = session
+        self.repo_url = f"{base_url.rstrip('/')}/repos/{repo}"
+        self.headers = {
+            "Authorization": f"token {token}",
+            "Accept": "application/vnd.github+json",
+        }
+
+    async def _request(self, method, path, **kwargs):
+        async with self.session.request(method, f"{self.repo_url}{path}", headers=self.headers,
+                                        raise_for_status=True, **kwargs) as response:
+            return await response.json(content_type=None)
+
+    async def get_team_folders(self):
+        contents = await self._request("GET", "/contents/teams")
+        folders = [item["name"] for item in contents if item["type"] == "dir"]
+        logger.debug(f"Retrieved team folders: {folders}")
+        return folders
+
+    async def get_file(self, path):
+        """Return (decoded content, blob sha) for a file on the default branch."""
+        data = await self._request("GET", f"/contents/{path}")
+        return base64.b64decode(data["content"]).decode("utf-8"), data["sha"]
+
+    async def get_branch_sha(self, branch):
+        data = await self._request("GET", f"/branches/{branch}")
+        return data["commit"]["sha"]
+
+    async def create_branch(self, branch_name, sha):
+        await self._request("POST", "/git/refs", json={"ref": f"refs/heads/{branch_name}", "sha": sha})
+
+    async def update_file(self, path, message, content, sha, branch):
+        await self._request("PUT", f"/contents/{path}", json={
+            "message": message,
+            "content": base64.b64encode(content.encode()).decode(),
+            "sha": sha,
+            "branch": branch,
+        })
+
+    async def create_pull(self, title, body, head, base):
+        return await self._request("POST", "/pulls", json={"title": title, "body": body, "head": head, "base": base})
+
+    async def add_labels(self, number, labels):
+        await self._request("POST", f"/issues/{number}/labels", json={"labels": labels})
+
+    async def request_reviewers(self, number, reviewers):
+        await self._request("POST", f"/pulls/{number}/requested_reviewers", json={"reviewers": reviewers})
+
+    async def edit_pull_body(self, number, body):
+        await self._request("PATCH", f"/pulls/{number}", json={"body": body})
+
+
+class AsyncJira:
+    """Minimal async Jira REST client covering the calls the handlers make."""
+
+    def __init__(self, session, server=JIRA_SERVER, email=JIRA_EMAIL, api_token=JIRA_API_TOKEN):
+        if not server:
+            raise ValueError("JIRA_SERVER is not set")
+        self.session = session
+        self.api_url = f"{server.rstrip('/')}/rest/api/2"
+        self.auth = aiohttp.BasicAuth(email or "", api_token or "")
+
+    async def _request(self, method, path, **kwargs):
+        async with self.session.request(method, f"{self.api_url}{path}", auth=self.auth,
+                                        raise_for_status=True, **kwargs) as response:
+            if response.status == 204:
+                return None
+            return await response.json(content_type=None)
+
+    async def get_account_id(self, email):
+        account_id = jira_account_cache.get(email)
+        if account_id:
+            return account_id
+        try:
+            users = await self._request("GET", "/user/search", params={"query": email, "maxResults": "1"})
+            if users:
+                jira_account_cache.set(email, users[0]["accountId"])
+                return users[0]["accountId"]
+        except aiohttp.ClientError as e:
+            logger.error(f"Error searching for user {email}: {str(e)}")
+        return None
+
+    async def create_issue(self, fields):
+        data = await self._request("POST", "/issue", json={"fields": fields})
+        return data["key"]
@@ -0,0 +1,376 @@
+import asyncio
+import json
+from slack_sdk.errors import SlackApiError
+from config import IDEMPOTENCY_WINDOW, PIPELINE_MAX_WORKERS, PROGRESS_UPDATE_INTERVAL, get_team_config
+from github_handlers import (add_jira_link_to_pr_body, breakglass_file_path, build_branch_name, build_pr_body,
+                             build_pr_title, cache_team_folders, get_cached_team_folders, parse_breakglass_emails,
+                             team_file_cache, team_folders_cache, update_content_for_email)
+from idempotency import AsyncSingleFlight, FailedRun
+from jira_handlers import build_issue_fields
+from progress import AsyncProgressReporter
+from prod_access import (STATUS_CREATING_PR, STATUS_NO_CHANGES, STATUS_PR_FAILED, build_email_update_error_response,
+                         build_missing_email_list_response, build_pipeline_context, creating_ticket_status, get_action_context,
+                         get_selected_team, jira_browse_link, linked_status, parse_edited_emails, summarise_results, ticket_failed_status)
+from utils import logger
+from views import (TEAM_SELECTION_VIEW_JSON, build_confirmed_email_list_message, build_duplicate_action_message,
+                   build_edit_modal_view, build_email_list_message, build_pr_approved_message, build_processing_message)
+
+# Shared across requests so double clicks and retries of the same action run once
+action_flights = AsyncSingleFlight(IDEMPOTENCY_WINDOW)
+# In-flight team list fetch, shared by concurrent team_search keystrokes; results are cached separately
+team_list_fetches = {}
+
+
+async def get_team_folders(github):
+    cached = get_cached_team_folders()
+    if cached is not None:
+        return cached
+
+    async def fetch():
+        try:
+            folders = await github.get_team_folders()
+            cache_team_folders(folders)
+            return folders
+        except Exception as e:
+            logger.error(f"Error retrieving team folders: {str(e)}")
+            return team_folders_cache.get_stale("teams", [])
+
+    task = team_list_fetches.get("teams")
+    if task is None:
+        task = team_list_fetches["teams"] = asyncio.create_task(fetch())
+        task.add_done_callback(lambda _: team_list_fetches.pop("teams", None))
+    # Shielded so one caller disconnecting does not cancel the fetch for the others
+    return await asyncio.shield(task)
+
+
+async def get_emails_from_github(team_name, github):
+    content = team_file_cache.get(team_name)
+    if content is None:
+        content, _ = await github.get_file(breakglass_file_path(team_name))
+        team_file_cache.set(team_name, content)
+    return parse_breakglass_emails(content)
+
+
+async def handle_slack_interactions(form_data, slack_client, slack_channel, team_email_lists, github, jira):
+    payload = json.loads(form_data["payload"])
+
+    if payload.get("type") == "view_submission":
+        return await handle_view_submission(payload, slack_client, slack_channel, team_email_lists, github, jira)
+    elif payload.get("type") == "block_actions":
+        return await handle_block_actions(payload, slack_client, slack_channel, team_email_lists, github, jira)
+    else:
+        return {"status": "error", "message": "Unknown interaction type"}
+
+
+async def handle_view_submission(payload, slack_client, slack_channel, team_email_lists, github, jira):
+    view = payload["view"]
+    callback_id = view["callback_id"]
+
+    if callback_id == "team_selection_modal":
+        return await handle_team_selection(view, team_email_lists, slack_client, slack_channel, github)
+    elif callback_id == "edit_people_modal":
+        flight_key = (view["private_metadata"], view.get("id", ""), callback_id)
+        return await action_flights.do(flight_key, lambda: handle_email_editing(view, team_email_lists, slack_client, slack_channel))
+    else:
+        logger.error(f"Unknown view submission callback_id: {callback_id}")
+        return {"response_action": "errors", "errors": {"general": "An unknown error occurred."}}
+
+
+async def handle_block_actions(payload, slack_client, slack_channel, team_email_lists, github, jira):
+    team_name, message_ts, action_id = get_action_context(payload)
+    flight_key = (team_name, message_ts, action_id)
+
+    if action_id == 'edit_people':
+        # Not deduplicated: each click has its own trigger_id and opening a modal has no side effects
+        return await open_edit_modal(payload['trigger_id'], team_name, team_email_lists, slack_client, github)
+    elif action_id == 'confirm_email_changes':
+        return await action_flights.do(flight_key, lambda: confirm_email_changes(team_name, team_email_lists, slack_client, slack_channel, github, jira))
+    elif action_id == 'confirm_prod_access':
+        # Runs as a background task so the interaction is acknowledged immediately
+        started = action_flights.submit(
+            flight_key,
+            lambda: confirm_prod_access(team_name, team_email_lists, slack_client, slack_channel, github, jira)
+        )
+        if not started:
+            logger.info(f"Ignoring duplicate confirm_prod_access for team {team_name} (message {message_ts})")
+            await post_duplicate_action_notice(team_name, payload.get("user", {}).get("id"), slack_client, slack_channel)
+        return {"response_action": "clear"}
+    else:
+        return {"status": "error", "message": "Unknown action"}
+
+
+async def handle_prod_access_command(form_data, slack_client):
+    try:
+        await slack_client.views_open(
+            trigger_id=form_data["trigger_id"],
+            view=TEAM_SELECTION_VIEW_JSON
+        )
+        return {"status": "success"}
+    except SlackApiError as e:
+        return {"status": "error", "error": str(e)}
+
+
+async def handle_team_selection(view, team_email_lists, slack_client, slack_channel, github):
+    team_name = get_selected_team(view)
+
+    try:
+        breakglass_emails = await get_emails_from_github(team_name, github)
+        # The new message shows the list from GitHub, so an earlier unconfirmed edit must not override it
+        team_email_lists.pop(team_name)
+        return await post_email_list_message(team_name, breakglass_emails, slack_client, slack_channel)
+    except ValueError as e:
+        await send_slack_message(f"Error: {str(e)}", slack_client, slack_channel)
+        return {"response_action": "clear"}
+    except Exception as e:
+        logger.error(f"Unexpected error in handle_team_selection: {str(e)}")
+        await send_slack_message("An unexpected error occurred. Please try again or contact support.", slack_client, slack_channel)
+        return {"response_action": "clear"}
+
+
+async def handle_email_editing(view, team_email_lists, slack_client, slack_channel):
+    team_name = view["private_metadata"]
+    new_emails = parse_edited_emails(view)
+
+    # Update the local cache
+    team_email_lists[team_name] = new_emails
+
+    # Show a preview of the changes
+    response = await post_email_list_message(team_name, new_emails, slack_client, slack_channel)
+    if response.get("response_action") == "errors":
+        # Nothing was posted, so a resubmission of the modal must run again
+        raise FailedRun(response)
+    return response
+
+
+async def open_edit_modal(trigger_id, team_name, team_email_lists, slack_client, github):
+    try:
+        # Try to get the most recent email list from the local cache
+        emails = team_email_lists.get(team_name)
+
+        # If not in cache, fetch from GitHub
+        if emails is None:
+            emails = await get_emails_from_github(team_name, github)
+            # Store in cache for future use
+            team_email_lists[team_name] = emails
+
+        await slack_client.views_open(trigger_id=trigger_id, view=build_edit_modal_view(team_name, emails))
+        return {"status": "success"}
+    except SlackApiError as e:
+        logger.error(f"Error opening edit modal: {e}")
+        return {"status": "error", "error": str(e)}
+
+
+async def post_email_list_message(team_name, emails, slack_client, slack_channel):
+    try:
+        response = await slack_client.chat_postMessage(channel=slack_channel, **build_email_list_message(team_name, emails))
+        logger.debug(f"Posted email list message: {response}")
+        return {"response_action": "clear"}
+    except SlackApiError as e:
+        logger.error(f"Error posting email list message: {e}")
+        return {"response_action": "errors", "errors": {"team_name": str(e)}}
+
+
+async def post_confirmed_email_list_message(team_name, emails, pr_message, jira_message, slack_client, slack_channel):
+    try:
+        response = await slack_client.chat_postMessage(
+            channel=slack_channel,
+            **build_confirmed_email_list_message(team_name, emails, pr_message, jira_message)
+        )
+        logger.debug(f"Posted confirmed email list message: {response}")
+        return {"response_action": "clear"}
+    except SlackApiError as e:
+        logger.error(f"Error posting confirmed email list message: {e}")
+        return {"response_action": "errors", "errors": {"email_list": "Failed to confirm email list"}}
+
+
+async def post_duplicate_action_notice(team_name, user_id, slack_client, slack_channel):
+    if not user_id:
+        return
+    try:
+        await slack_client.chat_postEphemeral(channel=slack_channel, user=user_id, **build_duplicate_action_message(team_name))
+    except SlackApiError as e:
+        logger.error(f"Error posting duplicate action notice: {e}")
+
+
+async def send_slack_message(message, slack_client, slack_channel):
+    try:
+        await slack_client.chat_postMessage(
+            channel=slack_channel,
+            text=message,
+            blocks=[{"type": "section", "text": {"type": "mrkdwn", "text": message}}]
+        )
+    except SlackApiError as e:
+        logger.error(f"Error sending Slack message: {e}")
+
+
+async def create_pr_for_email(github, team_name, file_path, content, file_sha, base_sha, email, manager_github_username):
+    updated_content = update_content_for_email(content, email)
+    if updated_content == content:
+        logger.info(f"No changes needed for email: {email}")
+        return None
+
+    branch_name = build_branch_name(team_name, email)
+    await github.create_branch(branch_name, base_sha)
+    await github.update_file(file_path, build_pr_title(team_name, email), updated_content, file_sha, branch_name)
+
+    pr_body = build_pr_body(email)
+    pr = await github.create_pull(build_pr_title(team_name, email), pr_body, branch_name, "master")
+
+    # Labels and reviewers are independent, so request both at once
+    follow_ups = [github.add_labels(pr["number"], ["firebreak-project"])]
+    if manager_github_username:
+        follow_ups.append(github.request_reviewers(pr["number"], [manager_github_username]))
+    await asyncio.gather(*follow_ups)
+
+    logger.info(f"Created GitHub PR: {pr['html_url']}")
+    return {"link": f"<{pr['html_url']}|PR-{pr['number']}>", "number": pr["number"], "email": email, "body": pr_body}
+
+
+async def create_jira_ticket(jira, email, team_name, pr, manager_email, manager_account_id):
+    requester_account_id = await jira.get_account_id(email)
+    if not requester_account_id or not manager_account_id:
+        logger.error(f"Could not find account ID for email: {email} or manager: {manager_email}")
+        return None
+
+    try:
+        key = await jira.create_issue(build_issue_fields(email, team_name, pr, requester_account_id, manager_account_id))
+        logger.info(f"Created Jira ticket: {key}")
+    except Exception as e:
+        logger.error(f"Error creating Jira ticket for {email}: {str(e)}")
+        return None
+    return {"key": key, "pr_number": pr["number"]}
+
+
+async def process_email(email, team_name, context, github, jira, report_progress):
+    """Run PR -> Jira ticket -> PR link for one email, reporting each stage as it finishes."""
+    result = {"email": email, "pr": None, "ticket": None}
+
+    await report_progress(email, STATUS_CREATING_PR)
+    try:
+        pr = await create_pr_for_email(github, team_name, context["file_path"], context["content"], context["file_sha"],
+                                       context["base_sha"], email, context["manager_github_username"])
+    except Exception as e:
+        logger.error(f"Failed to create GitHub PR for {email}: {str(e)}")
+        await report_progress(email, STATUS_PR_FAILED)
+        return result
+    if pr is None:
+        await report_progress(email, STATUS_NO_CHANGES)
+        return result
+    result["pr"] = pr
+
+    await report_progress(email, creating_ticket_status(pr))
+    try:
+        ticket = await create_jira_ticket(jira, email, team_name, pr, context["manager_email"], context["manager_account_id"])
+    except Exception as e:
+        # The PR already exists, so a Jira failure must not fail the whole confirmation
+        logger.error(f"Failed to create Jira ticket for {email}: {str(e)}")
+        ticket = None
+    if ticket is None:
+        await report_progress(email, ticket_failed_status(pr))
+        return result
+    result["ticket"] = ticket
+
+    try:
+        # The body is known from creation, so no need to fetch the PR again
+        await github.edit_pull_body(pr["number"], add_jira_link_to_pr_body(pr["body"], jira_browse_link(ticket["key"])))
+        logger.info(f"Updated PR #{pr['number']} with Jira link")
+    except Exception as e:
+        logger.error(f"Failed to update PR #{pr['number']} with Jira link: {str(e)}")
+    await report_progress(email, linked_status(pr, ticket))
+    return result
+
+
+async def run_prod_access_pipeline(team_name, emails, github, jira, report_progress):
+    """Run every email through its pipeline; returns (prs, pr_message, jira_message)."""
+    team_config = get_team_config(team_name) or {}
+    manager_email = team_config.get('manager_email')
+    file_path = breakglass_file_path(team_name)
+
+    async def get_manager_account_id():
+        return await jira.get_account_id(manager_email) if manager_email else None
+
+    (content, file_sha), base_sha, manager_account_id = await asyncio.gather(
+        github.get_file(file_path),
+        github.get_branch_sha("master"),
+        get_manager_account_id(),
+    )
+    context = build_pipeline_context(team_config, file_path, content, file_sha, base_sha, manager_account_id)
+
+    semaphore = asyncio.Semaphore(PIPELINE_MAX_WORKERS)
+
+    async def bounded(email):
+        async with semaphore:
+            return await process_email(email, team_name, context, github, jira, report_progress)
+
+    results = await asyncio.gather(*(bounded(email) for email in emails))
+    return summarise_results(results)
+
+
+async def confirm_email_changes(team_name, team_email_lists, slack_client, slack_channel, github, jira):
+    emails = team_email_lists.get(team_name, [])
+    if not emails:
+        raise FailedRun(build_missing_email_list_response())
+
+    async def ignore_progress(email, status):
+        pass
+
+    try:
+        prs, pr_message, jira_message = await run_prod_access_pipeline(team_name, emails, github, jira, ignore_progress)
+        error = None if prs else "No PRs were created"
+    except Exception as e:
+        logger.error(f"Failed to create GitHub PR: {str(e)}")
+        error = str(e)
+
+    if error:
+        # No PR was created, so clicking again must retry rather than replay this error
+        raise FailedRun(build_email_update_error_response(error))
+    # Confirmed, so the next request starts from the list in GitHub
+    team_email_lists.pop(team_name)
+    return await post_confirmed_email_list_message(team_name, emails, pr_message, jira_message, slack_client, slack_channel)
+
+
+async def confirm_prod_access(team_name, team_email_lists, slack_client, slack_channel, github, jira):
+    progress_ts = None
+    try:
+        response = await slack_client.chat_postMessage(channel=slack_channel, **build_processing_message(team_name))
+        progress_ts = response["ts"]
+    except SlackApiError as e:
+        logger.error(f"Error posting progress message: {e}")
+
+    reporter = None
+    prs = None
+    try:
+        breakglass_emails = team_email_lists.get(team_name)
+        if breakglass_emails is None:
+            breakglass_emails = await get_emails_from_github(team_name, github)
+
+        reporter = AsyncProgressReporter(team_name, breakglass_emails, progress_ts, slack_client, slack_channel, PROGRESS_UPDATE_INTERVAL)
+        prs, pr_message, jira_message = await run_prod_access_pipeline(team_name, breakglass_emails, github, jira, reporter.report)
+        await reporter.finish("done")
+        # Confirmed, so the next request starts from the list in GitHub
+        team_email_lists.pop(team_name)
+        await post_confirmed_email_list_message(team_name, breakglass_emails, pr_message, jira_message, slack_client, slack_channel)
+
+    except Exception as e:
+        if reporter is not None:
+            await reporter.finish("failed")
+        # If an error occurs, send an error message
+        await slack_client.chat_postMessage(
+            channel=slack_channel,
+            text=f":x: An error occurred while processing production access request for team {team_name}: {str(e)}"
+        )
+        logger.error(f"Error in confirm_prod_access: {str(e)}")
+        if not prs:
+            # Nothing was created, so re-raise to release the action flight and let the user click Confirm again
+            raise
+
+
+async def send_pr_approved_message(pr_number, pr_title, pr_url, approver, slack_client, slack_channel):
+    try:
+        await slack_client.chat_postMessage(
+            channel=slack_channel,
+            **build_pr_approved_message(pr_number, pr_title, pr_url, approver)
+        )
+        logger.info(f"Sent PR approved message for PR #{pr_number}")
+    except Exception as e:
+        logger.error(f"Error sending PR approved message: {str(e)}")
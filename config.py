@@ -1,5 +1,10 @@
 import os
 import json
+import tempfile
+from dotenv import load_dotenv
+
+# Loaded here, before any setting is read, so every entry point sees .env values
+load_dotenv()
 
 JIRA_API_TOKEN = os.getenv('JIRA_API_TOKEN')
 JIRA_EMAIL = os.getenv('JIRA_EMAIL')
@@ -7,14 +12,57 @@ JIRA_SERVER = os.getenv('JIRA_SERVER')
 JIRA_PROJECT_KEY = os.getenv('JIRA_PROJECT_KEY')
 SLACK_TOKEN = os.getenv('SLACK_TOKEN')
 SLACK_CHANNEL = os.getenv('SLACK_CHANNEL')
+SLACK_API_URL = os.getenv('SLACK_API_URL', 'https://slack.com/api/')
 GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
 GITHUB_REPO = os.getenv('GITHUB_REPO')
+GITHUB_API_URL = os.getenv('GITHUB_API_URL', 'https://api.github.com')
 GITHUB_WEBHOOK_SECRET = os.getenv('GITHUB_WEBHOOK_SECRET')
 
+# Slack caps external_select responses at 100 options
+TEAM_SEARCH_MAX_RESULTS = min(int(os.getenv('TEAM_SEARCH_MAX_RESULTS', '20')), 100)
+# Characters typed before Slack starts sending team_search requests
+TEAM_SEARCH_MIN_QUERY_LENGTH = int(os.getenv('TEAM_SEARCH_MIN_QUERY_LENGTH', '1'))
+TEAM_LIST_CACHE_TTL = int(os.getenv('TEAM_LIST_CACHE_TTL', '300'))
+# Seconds a completed Slack action is remembered to absorb double clicks and retries
+IDEMPOTENCY_WINDOW = int(os.getenv('IDEMPOTENCY_WINDOW', '600'))
+# Number of emails processed concurrently when confirming production access
+PIPELINE_MAX_WORKERS = int(os.getenv('PIPELINE_MAX_WORKERS', '4'))
+# Minimum seconds between progress message updates; Slack rate limits chat.update
+PROGRESS_UPDATE_INTERVAL = float(os.getenv('PROGRESS_UPDATE_INTERVAL', '1'))
+TEAM_CONFIG_DIR = os.getenv('TEAM_CONFIG_DIR', 'team_configs')
+# PR approvals for a team are collected for this many seconds before one digest is posted
+APPROVAL_DIGEST_WINDOW = float(os.getenv('APPROVAL_DIGEST_WINDOW', '30'))
+# Later approvals within this many seconds update the team's existing digest message
+APPROVAL_DIGEST_BATCH_TTL = float(os.getenv('APPROVAL_DIGEST_BATCH_TTL', '3600'))
+# Caches are snapshotted here so reused Lambda containers start warm; empty disables it.
+# Created with mode 0700 and only used if owned by this user and not writable by others.
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', os.path.join(tempfile.gettempdir(), f'pam-warm-state-{os.getuid()}'))
+# In async mode, seconds between writes of changed caches to the snapshot
+SNAPSHOT_FLUSH_INTERVAL = float(os.getenv('SNAPSHOT_FLUSH_INTERVAL', '5'))
+TEAM_FILE_CACHE_TTL = int(os.getenv('TEAM_FILE_CACHE_TTL', '60'))
+TEAM_CONFIG_CACHE_TTL = int(os.getenv('TEAM_CONFIG_CACHE_TTL', '300'))
+JIRA_ACCOUNT_CACHE_TTL = int(os.getenv('JIRA_ACCOUNT_CACHE_TTL', '86400'))
+# Unconfirmed email list edits are dropped after this long
+TEAM_EMAIL_LIST_TTL = int(os.getenv('TEAM_EMAIL_LIST_TTL', str(4 * 3600)))
+
+_team_config_cache = None
+
 def get_team_config(team_name):
-    config_file = f'team_configs/{team_name}.json'
+    # Imported here because warm_state reads its own settings from this module
+    global _team_config_cache
+    if _team_config_cache is None:
+        from warm_state import TtlCache
+        _team_config_cache = TtlCache("team_configs", TEAM_CONFIG_CACHE_TTL)
+
+    team_config = _team_config_cache.get(team_name)
+    if team_config is not None:
+        return team_config
+
+    config_file = os.path.join(TEAM_CONFIG_DIR, f'{team_name}.json')
     try:
         with open(config_file, 'r') as f:
-            return json.load(f)
+            team_config = json.load(f)
     except FileNotFoundError:
         return None
+    _team_config_cache.set(team_name, team_config)
+    return team_config
@@ -1,112 +1,127 @@
 from github import Github
-from config import GITHUB_TOKEN, GITHUB_REPO, GITHUB_WEBHOOK_SECRET, get_team_config
+from config import GITHUB_API_URL, GITHUB_TOKEN, GITHUB_REPO, GITHUB_WEBHOOK_SECRET, TEAM_FILE_CACHE_TTL, TEAM_LIST_CACHE_TTL
 from utils import logger
+from warm_state import TtlCache
 from datetime import datetime, timedelta
 import base64
 from github import Github, GithubException
 import json
 import hmac
 import hashlib
+import re
+
+def get_github_client():
+    return Github(GITHUB_TOKEN, base_url=GITHUB_API_URL)
+
+team_folders_cache = TtlCache("team_folders", TEAM_LIST_CACHE_TTL)
+# Raw team file content, used to list emails; PR creation always fetches fresh
+team_file_cache = TtlCache("team_files", TEAM_FILE_CACHE_TTL)
+
+def get_cached_team_folders():
+    """Return the cached team list if it is still fresh, otherwise None."""
+    return team_folders_cache.get("teams")
+
+def cache_team_folders(folders):
+    team_folders_cache.set("teams", folders)
 
 def get_team_folders():
+    # Cached because /slack/team_search calls this on every keystroke
+    cached = get_cached_team_folders()
+    if cached is not None:
+        return cached
+
     try:
-        g = Github(GITHUB_TOKEN)
+        g = get_github_client()
         repo = g.get_repo(GITHUB_REPO)
         contents = repo.get_contents("teams")
         folders = [item.name for item in contents if item.type == "dir"]
         logger.debug(f"Retrieved team folders: {folders}")
+        cache_team_folders(folders)
         return folders
     except Exception as e:
         logger.error(f"Error retrieving team folders: {str(e)}")
-        return []
+        return team_folders_cache.get_stale("teams", [])
     
-def update_github_and_create_pr(team_name, emails):
-    try:
-        logger.info(f"GITHUB_REPO environment variable: {GITHUB_REPO}")
-        g = Github(GITHUB_TOKEN)
-        repo = g.get_repo(GITHUB_REPO)
-        logger.info(f"Successfully connected to GitHub repo: {repo.full_name}")
-
-        file_path = f"teams/{team_name}/{team_name}.json"
-        logger.info(f"Attempting to get contents of file: {file_path}")
-        file_content = repo.get_contents(file_path)
-        logger.info("Successfully retrieved file contents")
-
-        content = file_content.decoded_content.decode()
-
-        base_branch = repo.get_branch("master")
-        prs_created = []
-
-        for email in emails:
-            # Create a new branch for each email
-            branch_name = f"update-breakglass-{team_name}-{email.split('@')[0]}-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
-            logger.info(f"Attempting to create new branch: {branch_name}")
-            repo.create_git_ref(ref=f"refs/heads/{branch_name}", sha=base_branch.commit.sha)
-            logger.info(f"Successfully created new branch: {branch_name}")
-
-            # Update content for this email
-            updated_content = update_content_for_email(content, email)
-
-            if updated_content == content:
-                logger.info(f"No changes needed for email: {email}")
-                return {"success": True, "message": updated_content.message}
-
-            # Update the file in the new branch
-            repo.update_file(
-                path=file_path,
-                message=f"Update BreakGlass email for {team_name}: {email}",
-                content=updated_content,
-                sha=file_content.sha,
-                branch=branch_name
-            )
-
-            # Create a pull request for this email
-            pr_body = f"Automatically generated PR to update BreakGlass email: {email}\n\n"
-            pr_body += "Jira ticket link will be added here."
-
-            pr = repo.create_pull(
-                title=f"Update BreakGlass email for {team_name}: {email}",
-                body=pr_body,
-                head=branch_name,
-                base="master"
-            )
-
-            # Add metadata to the PR
-            pr.add_to_labels("firebreak-project")
-
-            # Enable auto merge
-            #pr.enable_automerge("MERGE")
-
-            # Get team-specific configuration
-            team_config = get_team_config(team_name)
-            manager_github_username = team_config.get('manager_github_username') if team_config else None
-            # Add manager to be the reviewer if found in config
-            if manager_github_username:
-                pr.create_review_request(reviewers=[manager_github_username])
-
-            pr_link = f"<{pr.html_url}|PR-{pr.number}>"
-            logger.info(f"Created GitHub PR: {pr.html_url}")
-            prs_created.append({"link": pr_link, "number": pr.number, "email": email})
-
-
-        if prs_created:
-            return {"success": True, "prs": prs_created}
-        else:
-            return {"success": False, "message": "No PRs were created"}
+JIRA_LINK_PLACEHOLDER = "Jira ticket link will be added here."
 
-    except Exception as e:
-        logger.error(f"Failed to create GitHub PR: {str(e)}")
-        logger.error(f"Error type: {type(e).__name__}")
-        logger.error(f"Error args: {e.args}")
-        return {"success": False, "message": str(e)}
+def breakglass_file_path(team_name):
+    return f"teams/{team_name}/{team_name}.json"
+
+def build_branch_name(team_name, email):
+    return f"update-breakglass-{team_name}-{email.split('@')[0]}-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
+
+def build_pr_title(team_name, email):
+    return f"Update BreakGlass email for {team_name}: {email}"
+
+def parse_pr_title(title):
+    """Return (team_name, email) from a title built by build_pr_title, or None."""
+    match = re.fullmatch(r"Update BreakGlass email for (.+): (\S+)", title)
+    return match.groups() if match else None
+
+def build_pr_body(email):
+    return f"Automatically generated PR to update BreakGlass email: {email}\n\n{JIRA_LINK_PLACEHOLDER}"
+
+def add_jira_link_to_pr_body(body, jira_link):
+    return body.replace(JIRA_LINK_PLACEHOLDER, f"Corresponding Jira ticket: {jira_link}")
+
+def get_breakglass_file(repo, team_name):
+    file_path = breakglass_file_path(team_name)
+    logger.info(f"Attempting to get contents of file: {file_path}")
+    file_content = repo.get_contents(file_path)
+    logger.info("Successfully retrieved file contents")
+    return file_path, file_content
+
+def create_pr_for_email(repo, team_name, file_path, content, file_sha, base_sha, email, manager_github_username):
+    # Update content for this email
+    updated_content = update_content_for_email(content, email)
+
+    if updated_content == content:
+        logger.info(f"No changes needed for email: {email}")
+        return None
+
+    # Create a new branch for each email
+    branch_name = build_branch_name(team_name, email)
+    logger.info(f"Attempting to create new branch: {branch_name}")
+    repo.create_git_ref(ref=f"refs/heads/{branch_name}", sha=base_sha)
+    logger.info(f"Successfully created new branch: {branch_name}")
+
+    # Update the file in the new branch
+    repo.update_file(
+        path=file_path,
+        message=build_pr_title(team_name, email),
+        content=updated_content,
+        sha=file_sha,
+        branch=branch_name
+    )
+
+    # Create a pull request for this email
+    pr_body = build_pr_body(email)
+    pr = repo.create_pull(
+        title=build_pr_title(team_name, email),
+        body=pr_body,
+        head=branch_name,
+        base="master"
+    )
+
+    # Add metadata to the PR
+    pr.add_to_labels("firebreak-project")
+
+    # Enable auto merge
+    #pr.enable_automerge("MERGE")
+
+    # Add manager to be the reviewer if found in config
+    if manager_github_username:
+        pr.create_review_request(reviewers=[manager_github_username])
+
+    pr_link = f"<{pr.html_url}|PR-{pr.number}>"
+    logger.info(f"Created GitHub PR: {pr.html_url}")
+    return {"link": pr_link, "number": pr.number, "email": email, "body": pr_body}
 
 
 def update_pr_with_jira_link(repo, pr_number, jira_link):
     try:
         pr = repo.get_pull(pr_number)
-        current_body = pr.body
-        updated_body = current_body.replace("Jira ticket link will be added here.", f"Corresponding Jira ticket: {jira_link}")
-        pr.edit(body=updated_body)
+        pr.edit(body=add_jira_link_to_pr_body(pr.body, jira_link))
         logger.info(f"Updated PR #{pr_number} with Jira link")
     except Exception as e:
         logger.error(f"Failed to update PR #{pr_number} with Jira link: {str(e)}")
@@ -158,43 +173,50 @@ def update_content_for_email(content, email):
     updated_content = json.dumps(content_dict, indent=4)+ '\n'
     return updated_content
 
+def parse_breakglass_emails(content):
+    data = json.loads(content)
+    logger.debug(f"Parsed JSON data: {json.dumps(data, indent=2)}")
+    
+    breakglass_emails = []
+
+    prod_env_found = False
+
+    if 'Resources' in data and 'Aws' in data['Resources']:
+        for aws_account in data['Resources']['Aws']:
+            if 'Production' in aws_account and aws_account['Production']:
+                prod_env_found = True
+                if 'BreakGlass' in aws_account and 'Write' in aws_account['BreakGlass']:
+                    for entry in aws_account['BreakGlass']['Write']:
+                        if 'Email' in entry and 'Expiry' in entry:
+                            try:
+                                expiry_date = datetime.strptime(entry['Expiry'], '%Y-%m-%dT%H:%M:%SZ')
+                                if expiry_date > datetime.utcnow():
+                                    breakglass_emails.append(entry['Email'])
+                                    logger.debug(f"Added email: {entry['Email']}")
+                            except ValueError as ve:
+                                logger.warning(f"Invalid date format for email {entry['Email']}: {ve}")
+    if not prod_env_found:
+        raise ValueError("No AWS production environment found")
+
+    return breakglass_emails
+
 def get_emails_from_github(team_name):
     try:
-        g = Github(GITHUB_TOKEN)
-        repo = g.get_repo(GITHUB_REPO)
-        file_path = f"teams/{team_name}/{team_name}.json"
+        file_path = breakglass_file_path(team_name)
         
         logger.debug(f"Attempting to fetch file: {file_path}")
         
         try:
-            file_content = repo.get_contents(file_path)
-            content = base64.b64decode(file_content.content).decode('utf-8')
+            content = team_file_cache.get(team_name)
+            if content is None:
+                g = get_github_client()
+                repo = g.get_repo(GITHUB_REPO)
+                file_content = repo.get_contents(file_path)
+                content = base64.b64decode(file_content.content).decode('utf-8')
+                team_file_cache.set(team_name, content)
             logger.debug(f"Raw file content: {content}")
             
-            data = json.loads(content)
-            logger.debug(f"Parsed JSON data: {json.dumps(data, indent=2)}")
-            
-            breakglass_emails = []
-
-            prod_env_found = False
-
-            if 'Resources' in data and 'Aws' in data['Resources']:
-                for aws_account in data['Resources']['Aws']:
-                    if 'Production' in aws_account and aws_account['Production']:
-                        prod_env_found = True
-                        if 'BreakGlass' in aws_account and 'Write' in aws_account['BreakGlass']:
-                            for entry in aws_account['BreakGlass']['Write']:
-                                if 'Email' in entry and 'Expiry' in entry:
-                                    try:
-                                        expiry_date = datetime.strptime(entry['Expiry'], '%Y-%m-%dT%H:%M:%SZ')
-                                        if expiry_date > datetime.utcnow():
-                                            breakglass_emails.append(entry['Email'])
-                                            logger.debug(f"Added email: {entry['Email']}")
-                                    except ValueError as ve:
-                                        logger.warning(f"Invalid date format for email {entry['Email']}: {ve}")
-            if not prod_env_found:
-                raise ValueError("No AWS production environment found")
-            
+            breakglass_emails = parse_breakglass_emails(content)
             logger.debug(f"Extracted emails: {breakglass_emails}")
             
             return breakglass_emails
@@ -205,15 +227,39 @@ def get_emails_from_github(team_name):
         logger.error(f"Error in get_emails_from_github: {str(e)}")
         raise
 
-def verify_github_webhook(request):
-    signature = request.headers.get('X-Hub-Signature-256')
+def verify_github_signature(signature, body):
     if not signature:
         return False
 
     expected_signature = 'sha256=' + hmac.new(
         GITHUB_WEBHOOK_SECRET.encode(),
-        request.data,
+        body,
         hashlib.sha256
     ).hexdigest()
 
-    return hmac.compare_digest(signature, expected_signature)
\ No newline at end of file
+    return hmac.compare_digest(signature, expected_signature)
+
+def verify_github_webhook(request):
+    return verify_github_signature(request.headers.get('X-Hub-Signature-256'), request.data)
+
+def get_breakglass_approval(event, payload):
+    """Return the approved breakglass-update PR details from a webhook, or None."""
+    if event != 'pull_request_review':
+        return None
+
+    pr = payload['pull_request']
+    review = payload['review']
+    if payload['action'] != 'submitted' or review['state'] != 'approved':
+        return None
+
+    # Only PRs with the 'breakglass-update' label are reported
+    labels = [label['name'] for label in pr['labels']]
+    if 'breakglass-update' not in labels:
+        return None
+
+    return {
+        "pr_number": pr['number'],
+        "pr_title": pr['title'],
+        "pr_url": pr['html_url'],
+        "approver": review['user']['login'],
+    }
\ No newline at end of file
@@ -0,0 +1,168 @@
+import asyncio
+import threading
+import time
+from utils import logger
+
+
+class FailedRun(Exception):
+    """Raised by an action that failed without side effects but still has a response to give.
+
+    The flight is forgotten so the action can be retried, and `do` returns
+    `result` to its callers instead of raising. Actions that have already
+    changed something should return normally so they stay remembered.
+    """
+
+    def __init__(self, result):
+        super().__init__(result)
+        self.result = result
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.finished_at = None
+
+
+class SingleFlight:
+    """Collapses duplicate executions of the same keyed action.
+
+    While an action is running, identical requests wait for it and share its
+    result. Once it finishes successfully, identical requests within
+    `window` seconds get the original result back without running again.
+    A run counts as failed only if it raises (see FailedRun), and failed runs
+    are forgotten so the action can be retried.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.suppressed = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def _claim(self, key):
+        # Returns (flight, is_leader); caller must hold self._lock
+        now = time.monotonic()
+        for stale_key in [k for k, f in self._flights.items()
+                          if f.finished_at is not None and now - f.finished_at >= self.window]:
+            del self._flights[stale_key]
+
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.suppressed += 1
+            logger.info(f"Suppressed duplicate action {key} (total suppressed: {self.suppressed})")
+            return flight, False
+
+        flight = _Flight()
+        self._flights[key] = flight
+        return flight, True
+
+    def _run(self, key, flight, fn):
+        try:
+            flight.result = fn()
+        except Exception as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                if flight.error is None:
+                    flight.finished_at = time.monotonic()
+                else:
+                    # Failed runs are not remembered so the action can be retried
+                    self._flights.pop(key, None)
+            flight.done.set()
+
+    def do(self, key, fn):
+        """Run fn once for key and return its result to every concurrent caller."""
+        with self._lock:
+            flight, is_leader = self._claim(key)
+
+        if is_leader:
+            self._run(key, flight, fn)
+        else:
+            flight.done.wait()
+
+        if isinstance(flight.error, FailedRun):
+            return flight.error.result
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def submit(self, key, fn):
+        """Run fn for key in a background thread unless it is already running or recent.
+
+        Returns True if a new execution was started, False if it was a duplicate.
+        """
+        with self._lock:
+            flight, is_leader = self._claim(key)
+
+        if is_leader:
+            threading.Thread(target=self._run, args=(key, flight, fn)).start()
+        return is_leader
+
+
+class AsyncSingleFlight:
+    """asyncio counterpart of SingleFlight for the ASGI serving mode."""
+
+    def __init__(self, window):
+        self.window = window
+        self.suppressed = 0
+        self._flights = {}
+        self._tasks = set()
+
+    def _claim(self, key):
+        # No lock needed: there is no await between checking and registering a flight
+        now = time.monotonic()
+        for stale_key in [k for k, (_, finished_at) in self._flights.items()
+                          if finished_at is not None and now - finished_at >= self.window]:
+            del self._flights[stale_key]
+
+        if key in self._flights:
+            self.suppressed += 1
+            logger.info(f"Suppressed duplicate action {key} (total suppressed: {self.suppressed})")
+            return self._flights[key][0], False
+
+        future = asyncio.get_running_loop().create_future()
+        self._flights[key] = (future, None)
+        return future, True
+
+    async def _run(self, key, future, coro_fn):
+        try:
+            result = await coro_fn()
+        except asyncio.CancelledError:
+            self._flights.pop(key, None)
+            future.cancel()
+            raise
+        except Exception as e:
+            # Failed runs are not remembered so the action can be retried
+            self._flights.pop(key, None)
+            future.set_exception(e)
+        else:
+            self._flights[key] = (future, time.monotonic())
+            future.set_result(result)
+
+    async def do(self, key, coro_fn):
+        """Await coro_fn once for key and return its result to every concurrent caller."""
+        future, is_leader = self._claim(key)
+        if is_leader:
+            await self._run(key, future, coro_fn)
+        try:
+            # shield so a cancelled follower does not cancel the shared result
+            return await asyncio.shield(future)
+        except FailedRun as e:
+            return e.result
+
+    def submit(self, key, coro_fn):
+        """Schedule coro_fn for key as a background task unless it is already running or recent.
+
+        Returns True if a new execution was started, False if it was a duplicate.
+        """
+        future, is_leader = self._claim(key)
+        if is_leader:
+            # Nobody awaits a submitted flight, so retrieve its exception to avoid asyncio warnings
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            task = asyncio.create_task(self._run(key, future, coro_fn))
+            # Keep a reference so the task is not garbage collected mid-flight
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return is_leader
@@ -0,0 +1,260 @@
+"""Local stand-ins for the GitHub REST, Jira REST and Slack Web API endpoints the handlers use.
+
+Each fake answers just enough of its API for PyGithub, the jira client and
+slack_sdk to work, with configurable latency and error rate, and counts every
+call it receives so the load test can report external calls per request.
+"""
+import base64
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+
+class _Server(ThreadingHTTPServer):
+    # The default listen backlog of 5 resets connections under concurrent load
+    request_queue_size = 256
+    daemon_threads = True
+
+
+class FakeService:
+    """Base class: runs a threaded HTTP server and dispatches to `routes`."""
+
+    name = "fake"
+    # (method, compiled path regex, handler method name)
+    routes = []
+
+    def __init__(self, latency=0.0, error_rate=0.0, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self._make_handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_counters(self):
+        with self._lock:
+            self.calls = 0
+            self.errors = 0
+
+    def dispatch(self, method, path, body):
+        for route_method, pattern, handler_name in self.routes:
+            if route_method != method:
+                continue
+            match = pattern.fullmatch(path)
+            if match:
+                return getattr(self, handler_name)(body, *match.groups())
+        return 404, {"message": f"{self.name} fake has no route for {method} {path}"}
+
+    def _make_handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _handle(self):
+                with service._lock:
+                    service.calls += 1
+                if service.latency:
+                    time.sleep(service.latency)
+
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+
+                if random.random() < service.error_rate:
+                    with service._lock:
+                        service.errors += 1
+                    status, payload = 503, {"message": "Injected error"}
+                else:
+                    status, payload = service.dispatch(self.command, urlparse(self.path).path, raw)
+
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def _json(raw):
+    try:
+        return json.loads(raw or b"{}")
+    except ValueError:
+        return {}
+
+
+class FakeGitHub(FakeService):
+    name = "github"
+    routes = [
+        ("GET", re.compile(r"/repos/([^/]+/[^/]+)"), "get_repo"),
+        ("GET", re.compile(r"/repos/([^/]+/[^/]+)/contents/teams"), "list_teams"),
+        ("GET", re.compile(r"/repos/([^/]+/[^/]+)/contents/teams/([^/]+)/[^/]+\.json"), "get_team_file"),
+        ("PUT", re.compile(r"/repos/([^/]+/[^/]+)/contents/(.+)"), "update_file"),
+        ("GET", re.compile(r"/repos/([^/]+/[^/]+)/branches/([^/]+)"), "get_branch"),
+        ("POST", re.compile(r"/repos/([^/]+/[^/]+)/git/refs"), "create_ref"),
+        ("POST", re.compile(r"/repos/([^/]+/[^/]+)/pulls"), "create_pull"),
+        ("GET", re.compile(r"/repos/([^/]+/[^/]+)/pulls/(\d+)"), "get_pull"),
+        ("PATCH", re.compile(r"/repos/([^/]+/[^/]+)/pulls/(\d+)"), "edit_pull"),
+        ("POST", re.compile(r"/repos/([^/]+/[^/]+)/pulls/(\d+)/requested_reviewers"), "get_pull"),
+        ("POST", re.compile(r"/repos/([^/]+/[^/]+)/issues/(\d+)/labels"), "add_labels"),
+    ]
+
+    def __init__(self, teams, emails_per_team=3, **kwargs):
+        super().__init__(**kwargs)
+        self.teams = teams
+        self.emails_per_team = emails_per_team
+        self._pulls = {}
+        self._next_pull = 1
+
+    def _repo_url(self, full_name):
+        return f"{self.url}/repos/{full_name}"
+
+    def _team_file(self, team_name):
+        expiry = (datetime.utcnow() + timedelta(days=3)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        return {
+            "Resources": {
+                "Aws": [{
+                    "Production": True,
+                    "BreakGlass": {
+                        "Write": [
+                            {"Email": f"user{i}.{team_name}@example.com", "Expiry": expiry}
+                            for i in range(self.emails_per_team)
+                        ]
+                    }
+                }]
+            }
+        }
+
+    def get_repo(self, body, full_name):
+        return 200, {"id": 1, "name": full_name.split("/")[1], "full_name": full_name, "url": self._repo_url(full_name)}
+
+    def list_teams(self, body, full_name):
+        return 200, [
+            {"type": "dir", "name": team, "path": f"teams/{team}", "url": f"{self._repo_url(full_name)}/contents/teams/{team}"}
+            for team in self.teams
+        ]
+
+    def get_team_file(self, body, full_name, team_name):
+        if team_name not in self.teams:
+            return 404, {"message": "Not Found"}
+        path = f"teams/{team_name}/{team_name}.json"
+        content = json.dumps(self._team_file(team_name), indent=4) + "\n"
+        return 200, {
+            "type": "file", "encoding": "base64", "name": f"{team_name}.json", "path": path,
+            "sha": "0" * 40, "url": f"{self._repo_url(full_name)}/contents/{path}",
+            "content": base64.b64encode(content.encode()).decode(),
+        }
+
+    def update_file(self, body, full_name, path):
+        return 200, {"content": {"path": path, "sha": "1" * 40}, "commit": {"sha": "2" * 40}}
+
+    def get_branch(self, body, full_name, branch):
+        return 200, {"name": branch, "commit": {"sha": "3" * 40}}
+
+    def create_ref(self, body, full_name):
+        return 201, {"ref": _json(body).get("ref"), "object": {"sha": "3" * 40, "type": "commit"}}
+
+    def _pull(self, full_name, number):
+        pull = self._pulls.get(number, {"body": ""})
+        url = f"{self._repo_url(full_name)}/pulls/{number}"
+        return {
+            "number": number, "title": pull.get("title", ""), "body": pull["body"],
+            "url": url, "html_url": f"https://github.com/{full_name}/pull/{number}",
+            "issue_url": f"{self._repo_url(full_name)}/issues/{number}",
+        }
+
+    def create_pull(self, body, full_name):
+        data = _json(body)
+        with self._lock:
+            number = self._next_pull
+            self._next_pull += 1
+            self._pulls[number] = {"title": data.get("title", ""), "body": data.get("body", "")}
+        return 201, self._pull(full_name, number)
+
+    def get_pull(self, body, full_name, number):
+        return 200, self._pull(full_name, int(number))
+
+    def edit_pull(self, body, full_name, number):
+        data = _json(body)
+        with self._lock:
+            self._pulls.setdefault(int(number), {"body": ""}).update(data)
+        return 200, self._pull(full_name, int(number))
+
+    def add_labels(self, body, full_name, number):
+        data = _json(body)
+        labels = data if isinstance(data, list) else data.get("labels", [])
+        return 200, [{"name": label} for label in labels]
+
+
+class FakeJira(FakeService):
+    name = "jira"
+    routes = [
+        ("GET", re.compile(r"/rest/api/(?:\d+|latest)/serverInfo"), "server_info"),
+        ("GET", re.compile(r"/rest/api/(?:\d+|latest)/user/search"), "search_users"),
+        ("POST", re.compile(r"/rest/api/(?:\d+|latest)/issue"), "create_issue"),
+        ("GET", re.compile(r"/rest/api/(?:\d+|latest)/issue/([^/]+)"), "get_issue"),
+        ("PUT", re.compile(r"/rest/api/(?:\d+|latest)/issue/([^/]+)/assignee"), "assign_issue"),
+    ]
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._next_issue = 1
+
+    def server_info(self, body):
+        return 200, {"baseUrl": self.url, "version": "1001.0.0", "versionNumbers": [1001, 0, 0], "deploymentType": "Cloud"}
+
+    def search_users(self, body):
+        account_id = f"acc-{random.randrange(1 << 32):08x}"
+        return 200, [{"accountId": account_id, "active": True, "self": f"{self.url}/rest/api/2/user?accountId={account_id}"}]
+
+    def _issue(self, key):
+        return {"id": key.split("-")[-1], "key": key, "self": f"{self.url}/rest/api/2/issue/{key}", "fields": {}}
+
+    def create_issue(self, body):
+        with self._lock:
+            key = f"PAM-{self._next_issue}"
+            self._next_issue += 1
+        return 201, self._issue(key)
+
+    def get_issue(self, body, key):
+        return 200, self._issue(key)
+
+    def assign_issue(self, body, key):
+        return 200, {}
+
+
+class FakeSlack(FakeService):
+    name = "slack"
+    routes = [
+        ("POST", re.compile(r"/api/([\w.]+)"), "api_method"),
+    ]
+
+    def api_method(self, body, method):
+        response = {"ok": True}
+        if method in ("chat.postMessage", "chat.update"):
+            response.update({"channel": "C0LOADTEST", "ts": f"{time.time():.6f}"})
+        return 200, response
@@ -0,0 +1,228 @@
+"""Replay recorded Slack/GitHub payloads against the app backed by fake services.
+
+Usage (from the repository root):
+
+    python -m loadtest.run --concurrency 20 --requests 500 --latency 0.05 --error-rate 0.01
+    python -m loadtest.run --mode asgi --concurrency 200 --requests 2000
+
+Each payload file is JSON with a `path`, optional `headers`, and either a
+`form` (Slack, form-encoded; a dict `payload` is JSON-encoded) or a `json`
+body (GitHub webhooks, signed automatically). The placeholders `{{seq}}` and
+`{{team}}` are replaced per request so repeated replays are not collapsed as
+duplicates of each other; a value that is exactly "{{seq}}" becomes a number.
+"""
+import argparse
+import glob
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from loadtest.fake_services import FakeGitHub, FakeJira, FakeSlack
+
+WEBHOOK_SECRET = "loadtest-secret"
+PAYLOAD_DIR = os.path.join(os.path.dirname(__file__), "payloads")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("payloads", nargs="*", help="Recorded payload files (default: loadtest/payloads/*.json)")
+    parser.add_argument("--requests", type=int, default=200, help="Total requests to send")
+    parser.add_argument("--concurrency", type=int, default=10, help="Requests in flight at once")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds each fake service call takes")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of fake service calls that fail with 503")
+    parser.add_argument("--teams", type=int, default=50, help="Number of teams the fake GitHub repo holds")
+    parser.add_argument("--emails-per-team", type=int, default=3, help="BreakGlass emails per team")
+    parser.add_argument("--mode", choices=["wsgi", "asgi"], default="wsgi",
+                        help="Serve main.py (Flask) or asgi.py (Starlette on uvicorn)")
+    parser.add_argument("--settle", type=float, default=2.0,
+                        help="Seconds without external calls before background work is considered finished")
+    parser.add_argument("--digest-window", type=float, default=1.0,
+                        help="APPROVAL_DIGEST_WINDOW for the app: seconds between posts or updates of a team's digest")
+    return parser.parse_args()
+
+
+def start_fakes(args):
+    teams = [f"team-{i}" for i in range(args.teams)]
+    fakes = {
+        "github": FakeGitHub(teams, emails_per_team=args.emails_per_team, latency=args.latency, error_rate=args.error_rate),
+        "jira": FakeJira(latency=args.latency, error_rate=args.error_rate),
+        "slack": FakeSlack(latency=args.latency, error_rate=args.error_rate),
+    }
+    for fake in fakes.values():
+        fake.start()
+    return teams, fakes
+
+
+def configure_environment(teams, fakes, digest_window):
+    """Point the app at the fakes; returns the TemporaryDirectory holding team configs and the snapshot."""
+    # Team configs give every team a manager so the Jira stage is exercised
+    temp_dir = tempfile.TemporaryDirectory(prefix="pam-loadtest-")
+    config_dir = temp_dir.name
+    for team in teams:
+        with open(os.path.join(config_dir, f"{team}.json"), "w") as f:
+            json.dump({"manager_email": f"manager@{team}.example.com", "manager_github_username": "loadtest-manager"}, f)
+
+    # Must be set before the app modules import config
+    os.environ.update({
+        "SLACK_TOKEN": "xoxb-loadtest",
+        "SLACK_CHANNEL": "C0LOADTEST",
+        "SLACK_API_URL": f"{fakes['slack'].url}/api/",
+        "GITHUB_TOKEN": "ghp_loadtest",
+        "GITHUB_REPO": "loadtest/breakglass",
+        "GITHUB_API_URL": fakes["github"].url,
+        "GITHUB_WEBHOOK_SECRET": WEBHOOK_SECRET,
+        "JIRA_SERVER": fakes["jira"].url,
+        "JIRA_EMAIL": "loadtest@example.com",
+        "JIRA_API_TOKEN": "loadtest",
+        "JIRA_PROJECT_KEY": "PAM",
+        "TEAM_CONFIG_DIR": config_dir,
+        "APPROVAL_DIGEST_WINDOW": str(digest_window),
+        # Start cold so results are not skewed by a previous run's snapshot
+        "SNAPSHOT_DIR": config_dir,
+    })
+    return temp_dir
+
+
+def start_app():
+    from werkzeug.serving import make_server
+    from main import app
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def start_asgi_app():
+    import socket
+    import uvicorn
+    from asgi import app
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    class Handle:
+        def shutdown(self):
+            server.should_exit = True
+
+    return Handle(), f"http://127.0.0.1:{port}"
+
+
+def render(template, seq, team):
+    # A value that is exactly "{{seq}}" becomes a number, e.g. a PR number
+    raw = json.dumps(template).replace('"{{seq}}"', str(seq))
+    raw = raw.replace("{{seq}}", str(seq)).replace("{{team}}", team)
+    return json.loads(raw)
+
+
+def build_request(base_url, recorded):
+    headers = dict(recorded.get("headers", {}))
+    if "json" in recorded:
+        body = json.dumps(recorded["json"]).encode()
+        headers["Content-Type"] = "application/json"
+        headers["X-Hub-Signature-256"] = "sha256=" + hmac.new(WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    else:
+        form = {key: json.dumps(value) if isinstance(value, dict) else value
+                for key, value in recorded.get("form", {}).items()}
+        body = urllib.parse.urlencode(form).encode()
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+    return urllib.request.Request(base_url + recorded["path"], data=body, headers=headers, method="POST")
+
+
+def send(request):
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            response.read()
+            ok = response.status < 500
+    except urllib.error.HTTPError as e:
+        ok = e.code < 500
+    except Exception:
+        ok = False
+    return request.selector, time.perf_counter() - started, ok
+
+
+def wait_for_quiet(fakes, settle):
+    # confirm_prod_access continues in background threads after the response
+    last_total = -1
+    while True:
+        total = sum(fake.calls for fake in fakes.values())
+        if total == last_total:
+            return
+        last_total = total
+        time.sleep(settle)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def report(results, elapsed, fakes):
+    print(f"{'endpoint':<22}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    by_path = {}
+    for path, latency, ok in results:
+        by_path.setdefault(path, []).append((latency, ok))
+    for path, samples in sorted(by_path.items()) + [("all", [(l, ok) for _, l, ok in results])]:
+        latencies = [latency * 1000 for latency, _ in samples]
+        errors = sum(1 for _, ok in samples if not ok)
+        print(f"{path:<22}{len(samples):>7}{errors:>8}"
+              f"{percentile(latencies, 50):>10.1f}{percentile(latencies, 95):>10.1f}{percentile(latencies, 99):>10.1f}")
+
+    print(f"\nthroughput: {len(results) / elapsed:.1f} req/s over {elapsed:.2f}s")
+    total_calls = 0
+    for name, fake in fakes.items():
+        total_calls += fake.calls
+        print(f"{name} calls: {fake.calls} ({fake.calls / len(results):.2f}/request, {fake.errors} injected errors)")
+    print(f"external calls per request: {total_calls / len(results):.2f}")
+
+
+def main():
+    args = parse_args()
+    payload_files = args.payloads or sorted(glob.glob(os.path.join(PAYLOAD_DIR, "*.json")))
+    templates = []
+    for path in payload_files:
+        with open(path) as f:
+            templates.append(json.load(f))
+
+    teams, fakes = start_fakes(args)
+    temp_dir = configure_environment(teams, fakes, args.digest_window)
+    try:
+        server, base_url = start_asgi_app() if args.mode == "asgi" else start_app()
+
+        requests = [build_request(base_url, render(templates[seq % len(templates)], seq, teams[seq % len(teams)]))
+                    for seq in range(args.requests)]
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            results = list(executor.map(send, requests))
+        elapsed = time.perf_counter() - started
+
+        # Buffered approval digests make no calls until their window has passed
+        wait_for_quiet(fakes, max(args.settle, args.digest_window + 1))
+        report(results, elapsed, fakes)
+
+        server.shutdown()
+    finally:
+        for fake in fakes.values():
+            fake.stop()
+        temp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
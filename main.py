@@ -1,46 +1,50 @@
 import base64
 import json
-from dotenv import load_dotenv
 from flask import Flask, request, jsonify
 from slack_sdk import WebClient
 import logging
 import awsgi
 import urllib.parse
 
-from config import SLACK_CHANNEL, SLACK_TOKEN
+from config import (APPROVAL_DIGEST_BATCH_TTL, APPROVAL_DIGEST_WINDOW, SLACK_API_URL, SLACK_CHANNEL, SLACK_TOKEN,
+                    TEAM_EMAIL_LIST_TTL)
+from approval_digest import ApprovalDigest
 from slack_handlers import handle_slack_interactions, handle_prod_access_command, send_pr_approved_message
-from github_handlers import get_team_folders, verify_github_webhook
-
-# Load environment variables
-load_dotenv()
+from github_handlers import get_breakglass_approval, get_team_folders, verify_github_webhook
+from views import build_team_options
+from warm_state import TtlCache, snapshot
 
 app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
 
 # Initialize Slack Client
-slack_client = WebClient(token=SLACK_TOKEN)
+slack_client = WebClient(token=SLACK_TOKEN, base_url=SLACK_API_URL)
+
+# Collects PR approvals per team into a single Slack message, updated at most once per window
+approval_digest = ApprovalDigest(slack_client, SLACK_CHANNEL, APPROVAL_DIGEST_WINDOW, APPROVAL_DIGEST_BATCH_TTL)
 
 
-team_email_lists = {}
+# In-flight email edits per team; kept in memory only, since they decide who gets break-glass PRs
+team_email_lists = TtlCache("team_email_lists", TEAM_EMAIL_LIST_TTL, store=None)
+
+@app.teardown_request
+def flush_warm_state(exception):
+    # Approvals held back by the digest window go out with whichever request comes after it
+    approval_digest.send_due()
+    # One snapshot write per request, however many caches it changed
+    snapshot.flush()
 
 @app.route('/slack/team_search', methods=['POST'])
 def team_search():
-    payload = request.form
-    query = payload.get('value', '').lower()
-    
-    all_teams = get_team_folders()
-    matching_teams = [team for team in all_teams if query in team.lower()]
-    
-    options = [
-        {
-            "text": {"type": "plain_text", "text": team},
-            "value": team
-        }
-        for team in matching_teams[:20]  # Limit to 20 results
-    ]
+    # Slack sends block_suggestion requests as a JSON "payload" form field
+    if "payload" in request.form:
+        payload = json.loads(request.form["payload"])
+    else:
+        payload = request.form
+    query = payload.get('value', '')
     
     return jsonify({
-        "options": options
+        "options": build_team_options(get_team_folders(), query)
     })
 
 @app.route('/slack/actions', methods=['POST'])
@@ -61,26 +65,12 @@ def github_webhook():
     if not verify_github_webhook(request):
         return jsonify({"error": "Invalid signature"}), 403
 
-    event = request.headers.get('X-GitHub-Event')
-    payload = request.json
-
-    if event == 'pull_request_review':
-        action = payload['action']
-        pr = payload['pull_request']
-        review = payload['review']
-
-        if action == 'submitted' and review['state'] == 'approved':
-            # Check if the PR has the 'breakglass-update' label
-            labels = [label['name'] for label in pr['labels']]
-            if 'breakglass-update' in labels:
-                # Extract relevant information
-                pr_number = pr['number']
-                pr_title = pr['title']
-                pr_url = pr['html_url']
-                approver = review['user']['login']
-
-                # Send Slack message
-                send_pr_approved_message(pr_number, pr_title, pr_url, approver, slack_client, SLACK_CHANNEL)
+    approval = get_breakglass_approval(request.headers.get('X-GitHub-Event'), request.json)
+    if approval:
+        approval_digest.add(
+            approval,
+            lambda single: send_pr_approved_message(**single, slack_client=slack_client, slack_channel=SLACK_CHANNEL)
+        )
 
     return jsonify({"status": "success"}), 200
 
@@ -0,0 +1,88 @@
+"""Production access flow logic shared by slack_handlers (WSGI) and async_handlers (ASGI).
+
+Nothing here does I/O. Each handler module makes its own Slack, GitHub and Jira
+calls and uses these functions for the decisions and text in between, so the
+two serving modes behave the same.
+"""
+from config import JIRA_SERVER
+
+STATUS_QUEUED = "queued"
+STATUS_CREATING_PR = "creating PR..."
+STATUS_PR_FAILED = ":x: failed to create PR"
+STATUS_NO_CHANGES = "no changes needed"
+
+
+def get_action_context(payload):
+    """Return (team_name, message_ts, action_id) for a block_actions payload."""
+    team_name = payload.get("message", {}).get("metadata", {}).get("event_payload", {}).get("team_name", "")
+    message_ts = payload.get("container", {}).get("message_ts") or payload.get("message", {}).get("ts", "")
+    return team_name, message_ts, payload["actions"][0]["action_id"]
+
+
+def get_selected_team(view):
+    return view["state"]["values"]["team_name"]["team_name_select"]["selected_option"]["value"]
+
+
+def parse_edited_emails(view):
+    new_emails = view["state"]["values"]["email_list"]["email_input"]["value"].split("\n")
+    return [email.strip() for email in new_emails if email.strip()]
+
+
+def jira_browse_link(key):
+    return f"{JIRA_SERVER}/browse/{key}"
+
+
+def build_pipeline_context(team_config, file_path, content, file_sha, base_sha, manager_account_id):
+    """Shared, read-only inputs for every email's pipeline."""
+    return {
+        "file_path": file_path,
+        "content": content,
+        "file_sha": file_sha,
+        "base_sha": base_sha,
+        "manager_github_username": team_config.get('manager_github_username'),
+        "manager_email": team_config.get('manager_email'),
+        "manager_account_id": manager_account_id,
+    }
+
+
+def creating_ticket_status(pr):
+    return f"{pr['link']} created, creating Jira ticket..."
+
+
+def ticket_failed_status(pr):
+    return f"{pr['link']} created, :x: Jira ticket creation failed"
+
+
+def linked_status(pr, ticket):
+    return f":white_check_mark: {pr['link']} linked to <{jira_browse_link(ticket['key'])}|{ticket['key']}>"
+
+
+def summarise_results(results):
+    """Return (prs, pr_message, jira_message) for the per-email pipeline results."""
+    prs = [r["pr"] for r in results if r["pr"]]
+    tickets = [r["ticket"] for r in results if r["ticket"]]
+
+    if prs:
+        pr_message = f"PRs created: {', '.join(pr['link'] for pr in prs)}"
+    else:
+        pr_message = "Failed to create PRs: No PRs were created"
+
+    if tickets:
+        jira_links = [f"<{jira_browse_link(ticket['key'])}|{ticket['key']}>" for ticket in tickets]
+        jira_message = f"Jira tickets created: {', '.join(jira_links)}"
+    else:
+        jira_message = "No Jira tickets created"
+    return prs, pr_message, jira_message
+
+
+def build_missing_email_list_response():
+    return {"response_action": "errors", "errors": {"general": "No email list found for this team."}}
+
+
+def build_email_update_error_response(error):
+    return {
+        "response_action": "errors",
+        "errors": {
+            "email_list": f"Failed to update email list in GitHub: {error}. Please try again."
+        }
+    }
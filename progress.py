@@ -0,0 +1,121 @@
+import asyncio
+import contextlib
+import threading
+import time
+from slack_sdk.errors import SlackApiError
+from prod_access import STATUS_QUEUED
+from utils import logger
+from views import build_progress_message, update_progress_message
+
+
+class _ProgressState:
+    """Per-email progress shared by the sync and async reporters.
+
+    Workers only record their latest status. Slack is updated from a separate
+    flush that sends whatever the latest state is at that moment, at most once
+    every `min_interval` seconds, so bursts of stage changes become one
+    chat.update and stay under Slack's rate limit.
+    """
+
+    def __init__(self, team_name, emails, ts, slack_client, slack_channel, min_interval):
+        self.team_name = team_name
+        self.ts = ts
+        self.slack_client = slack_client
+        self.slack_channel = slack_channel
+        self.min_interval = min_interval
+        self.progress = {email: STATUS_QUEUED for email in emails}
+        self._flush_scheduled = False
+        self._last_flush = float("-inf")
+        self._finished = False
+
+    def _record(self, email, status):
+        """Record a status; returns the delay before a flush if one needs scheduling, else None."""
+        self.progress[email] = status
+        if self.ts is None or self._flush_scheduled or self._finished:
+            return None
+        self._flush_scheduled = True
+        return max(0.0, self._last_flush + self.min_interval - time.monotonic())
+
+    def _take_snapshot(self):
+        self._flush_scheduled = False
+        self._last_flush = time.monotonic()
+        return dict(self.progress)
+
+
+class ProgressReporter(_ProgressState):
+    def __init__(self, team_name, emails, ts, slack_client, slack_channel, min_interval):
+        super().__init__(team_name, emails, ts, slack_client, slack_channel, min_interval)
+        # Guards the progress state only; never held across a Slack call
+        self._lock = threading.Lock()
+        # Held while updating Slack so updates are sent in order
+        self._flush_lock = threading.Lock()
+        self._timer = None
+
+    def report(self, email, status):
+        with self._lock:
+            delay = self._record(email, status)
+            if delay is None:
+                return
+            self._timer = threading.Timer(delay, self._flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush(self):
+        with self._flush_lock:
+            with self._lock:
+                if self._finished:
+                    # A timer that fired while finish() held the flush lock must not overwrite the final state
+                    return
+                progress = self._take_snapshot()
+            update_progress_message(self.team_name, progress, self.ts, self.slack_client, self.slack_channel)
+
+    def finish(self, outcome):
+        """Replace the progress message with its final state, e.g. outcome "done" or "failed"."""
+        with self._lock:
+            self._finished = True
+            if self._timer is not None:
+                self._timer.cancel()
+        with self._flush_lock:
+            with self._lock:
+                progress = self._take_snapshot()
+            update_progress_message(self.team_name, progress, self.ts, self.slack_client, self.slack_channel, outcome)
+
+
+class AsyncProgressReporter(_ProgressState):
+    def __init__(self, team_name, emails, ts, slack_client, slack_channel, min_interval):
+        super().__init__(team_name, emails, ts, slack_client, slack_channel, min_interval)
+        self._flush_lock = asyncio.Lock()
+        self._tasks = set()
+
+    async def report(self, email, status):
+        delay = self._record(email, status)
+        if delay is not None:
+            task = asyncio.create_task(self._flush_later(delay))
+            # Keep a reference so the task is not garbage collected mid-flight
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _flush_later(self, delay):
+        await asyncio.sleep(delay)
+        await self._flush()
+
+    async def _flush(self, outcome=None):
+        async with self._flush_lock:
+            progress = self._take_snapshot()
+            if self.ts is None:
+                return
+            try:
+                await self.slack_client.chat_update(channel=self.slack_channel, ts=self.ts,
+                                                    **build_progress_message(self.team_name, progress, outcome))
+            except SlackApiError as e:
+                logger.error(f"Error updating progress message: {e}")
+
+    async def finish(self, outcome):
+        """Replace the progress message with its final state, e.g. outcome "done" or "failed"."""
+        self._finished = True
+        # Pending or in-flight updates are superseded by the final one
+        for task in list(self._tasks):
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        await self._flush(outcome)
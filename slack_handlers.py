@@ -2,17 +2,26 @@ import json
 import os
 from flask import jsonify
 from flask.views import View
-from github import Github
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
-from config import GITHUB_REPO, GITHUB_TOKEN, JIRA_SERVER
-from github_handlers import get_emails_from_github, update_github_and_create_pr, update_pr_with_jira_link
-from jira_handlers import create_jira_tickets
+from config import GITHUB_REPO, IDEMPOTENCY_WINDOW, PIPELINE_MAX_WORKERS, PROGRESS_UPDATE_INTERVAL, get_team_config
+from github_handlers import create_pr_for_email, get_breakglass_file, get_emails_from_github, get_github_client, update_pr_with_jira_link
+from jira_handlers import create_jira_ticket, get_account_id, get_jira_client
+from idempotency import FailedRun, SingleFlight
+from progress import ProgressReporter
+from prod_access import (STATUS_CREATING_PR, STATUS_NO_CHANGES, STATUS_PR_FAILED, build_email_update_error_response,
+                         build_missing_email_list_response, build_pipeline_context, creating_ticket_status, get_action_context,
+                         get_selected_team, jira_browse_link, linked_status, parse_edited_emails, summarise_results, ticket_failed_status)
 from utils import logger, send_slack_message
-from views import get_team_selection_view, open_edit_modal, post_email_list_message, post_confirmed_email_list_message
+from warm_state import snapshot
+from views import TEAM_SELECTION_VIEW_JSON, open_edit_modal, post_email_list_message, post_confirmed_email_list_message, post_progress_message, post_duplicate_action_notice, build_pr_approved_message
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from flask import current_app
 
+# Shared across requests so double clicks and retries of the same action run once
+action_flights = SingleFlight(IDEMPOTENCY_WINDOW)
+
 def handle_slack_interactions(form_data, logger, slack_client, slack_channel, team_email_lists):
     payload = json.loads(form_data["payload"])
     
@@ -28,31 +37,34 @@ def handle_view_submission(payload, logger, slack_client, slack_channel, team_em
     callback_id = view["callback_id"]
 
     if callback_id == "team_selection_modal":
-        return handle_team_selection(view, slack_client, slack_channel)
+        return handle_team_selection(view, team_email_lists, slack_client, slack_channel)
     elif callback_id == "edit_people_modal":
-        return handle_email_editing(view, team_email_lists, slack_client, slack_channel)
+        flight_key = (view["private_metadata"], view.get("id", ""), callback_id)
+        return action_flights.do(flight_key, lambda: handle_email_editing(view, team_email_lists, slack_client, slack_channel))
     else:
         logger.error(f"Unknown view submission callback_id: {callback_id}")
         return {"response_action": "errors", "errors": {"general": "An unknown error occurred."}}
 
 def handle_block_actions(payload, logger, slack_client, slack_channel, team_email_lists):
-    action = payload["actions"][0]
-    action_id = action["action_id"]
-    team_name = payload.get("message", {}).get("metadata", {}).get("event_payload", {}).get("team_name", "")
+    team_name, message_ts, action_id = get_action_context(payload)
+    flight_key = (team_name, message_ts, action_id)
 
     if action_id == 'edit_people':
+        # Not deduplicated: each click has its own trigger_id and opening a modal has no side effects
         return open_edit_modal(payload['trigger_id'], team_name, team_email_lists, slack_client)
     elif action_id == 'confirm_email_changes':
-        return confirm_email_changes(team_name, team_email_lists, slack_client, slack_channel)
+        return action_flights.do(flight_key, lambda: confirm_email_changes(team_name, team_email_lists, slack_client, slack_channel))
     elif action_id == 'confirm_prod_access':
-        slack_client.chat_postMessage(
-            channel=slack_channel,
-            text=f"Processing production access request for team {team_name}. This may take a few moments...:hourglass_flowing_sand:"
-        )
-        
-        # Start the confirm_prod_access function in a separate thread with app context
+        # Start the confirm_prod_access function in a separate thread with app context,
+        # unless the same confirmation is already running or has just finished
         app = current_app._get_current_object()  # Get the actual app object
-        threading.Thread(target=confirm_prod_access_with_context, args=(app, team_name, team_email_lists, slack_client, slack_channel, payload)).start()
+        started = action_flights.submit(
+            flight_key,
+            lambda: confirm_prod_access_with_context(app, team_name, team_email_lists, slack_client, slack_channel, payload)
+        )
+        if not started:
+            logger.info(f"Ignoring duplicate confirm_prod_access for team {team_name} (message {message_ts})")
+            post_duplicate_action_notice(team_name, payload.get("user", {}).get("id"), slack_client, slack_channel)
         
         # Return an empty response to acknowledge the action
         return jsonify({"response_action": "clear"})
@@ -63,18 +75,19 @@ def handle_prod_access_command(form_data, slack_client):
     try:
         slack_client.views_open(
             trigger_id=form_data["trigger_id"],
-            view=get_team_selection_view()
+            view=TEAM_SELECTION_VIEW_JSON
         )
         return jsonify({"status": "success"})
     except SlackApiError as e:
         return jsonify({"status": "error", "error": str(e)})
     
-def handle_team_selection(view, slack_client, slack_channel):
-    selected_option = view["state"]["values"]["team_name"]["team_name_select"]["selected_option"]
-    team_name = selected_option["value"]
+def handle_team_selection(view, team_email_lists, slack_client, slack_channel):
+    team_name = get_selected_team(view)
     
     try:
         breakglass_emails = get_emails_from_github(team_name)
+        # The new message shows the list from GitHub, so an earlier unconfirmed edit must not override it
+        team_email_lists.pop(team_name)
         return post_email_list_message(team_name, breakglass_emails, slack_client, slack_channel)
     except ValueError as e:
         send_slack_message(f"Error: {str(e)}", slack_client)
@@ -86,107 +99,149 @@ def handle_team_selection(view, slack_client, slack_channel):
 
 def handle_email_editing(view, team_email_lists, slack_client, slack_channel):
     team_name = view["private_metadata"]
-    new_emails = view["state"]["values"]["email_list"]["email_input"]["value"].split("\n")
-    new_emails = [email.strip() for email in new_emails if email.strip()]
+    new_emails = parse_edited_emails(view)
 
     # Update the local cache
     team_email_lists[team_name] = new_emails
 
     # Show a preview of the changes
-    return post_email_list_message(team_name, new_emails, slack_client, slack_channel)
+    response = post_email_list_message(team_name, new_emails, slack_client, slack_channel)
+    if response.get("response_action") == "errors":
+        # Nothing was posted, so a resubmission of the modal must run again
+        raise FailedRun(response)
+    return response
 
 
 def confirm_email_changes(team_name, team_email_lists, slack_client, slack_channel):
     emails = team_email_lists.get(team_name, [])
     if not emails:
-        return jsonify({"response_action": "errors", "errors": {"general": "No email list found for this team."}})
+        raise FailedRun(jsonify(build_missing_email_list_response()))
 
-    result = update_github_and_create_pr(team_name, emails)
-    if result["success"]:
-        # Create Jira tickets
-        jira_result = create_jira_tickets(emails, team_name)
-        
-        # Prepare the message
-        pr_message = f"A pull request has been created to update the BreakGlass emails. <{result['pr_url']}|View PR>"
-        jira_message = jira_result["message"] if jira_result["success"] else "Failed to create Jira tickets. Please try again or contact support."
-        
-        return post_confirmed_email_list_message(team_name, emails, pr_message, jira_message, slack_client, slack_channel)
-    else:
-        return jsonify({
-            "response_action": "errors",
-            "errors": {
-                "email_list": f"Failed to update email list in GitHub: {result.get('error', 'Unknown error')}. Please try again."
-            }
-        })
+    try:
+        prs, pr_message, jira_message = run_prod_access_pipeline(team_name, emails, lambda email, status: None)
+        error = None if prs else "No PRs were created"
+    except Exception as e:
+        logger.error(f"Failed to create GitHub PR: {str(e)}")
+        error = str(e)
+
+    if error:
+        # No PR was created, so clicking again must retry rather than replay this error
+        raise FailedRun(jsonify(build_email_update_error_response(error)))
+    # Confirmed, so the next request starts from the list in GitHub
+    team_email_lists.pop(team_name)
+    return post_confirmed_email_list_message(team_name, emails, pr_message, jira_message, slack_client, slack_channel)
     
 
 
 def confirm_prod_access_with_context(app, team_name, team_email_lists, slack_client, slack_channel, payload):
     with app.app_context():
-        confirm_prod_access(team_name, team_email_lists, slack_client, slack_channel, payload)
+        try:
+            confirm_prod_access(team_name, team_email_lists, slack_client, slack_channel, payload)
+        finally:
+            # Runs after the request's own flush, so write what the pipeline cached
+            snapshot.flush()
+
+
+# Per-thread Jira clients for the pipeline workers; a client's requests.Session is not safe to share between threads
+thread_clients = threading.local()
+
+def get_thread_jira_client():
+    # One per thread rather than per email, since creating a client fetches the server info
+    if getattr(thread_clients, "jira", None) is None:
+        thread_clients.jira = get_jira_client()
+    return thread_clients.jira
+
+
+def process_email(email, team_name, context, report_progress):
+    """Run PR -> Jira ticket -> PR link for one email, reporting each stage as it finishes."""
+    # PyGithub clients are not shared between threads either; lazy avoids an extra API call
+    repo = get_github_client().get_repo(GITHUB_REPO, lazy=True)
+    result = {"email": email, "pr": None, "ticket": None}
+
+    report_progress(email, STATUS_CREATING_PR)
+    try:
+        pr = create_pr_for_email(repo, team_name, context["file_path"], context["content"], context["file_sha"],
+                                 context["base_sha"], email, context["manager_github_username"])
+    except Exception as e:
+        logger.error(f"Failed to create GitHub PR for {email}: {str(e)}")
+        report_progress(email, STATUS_PR_FAILED)
+        return result
+    if pr is None:
+        report_progress(email, STATUS_NO_CHANGES)
+        return result
+    result["pr"] = pr
+
+    report_progress(email, creating_ticket_status(pr))
+    try:
+        ticket = create_jira_ticket(get_thread_jira_client(), email, team_name, pr, context["manager_email"], context["manager_account_id"])
+    except Exception as e:
+        # The PR already exists, so a Jira failure must not fail the whole confirmation
+        logger.error(f"Failed to create Jira ticket for {email}: {str(e)}")
+        ticket = None
+    if ticket is None:
+        report_progress(email, ticket_failed_status(pr))
+        return result
+    result["ticket"] = ticket
+
+    update_pr_with_jira_link(repo, pr["number"], jira_browse_link(ticket["key"]))
+    report_progress(email, linked_status(pr, ticket))
+    return result
+
+
+def run_prod_access_pipeline(team_name, emails, report_progress):
+    """Run every email through its pipeline; returns (prs, pr_message, jira_message)."""
+    repo = get_github_client().get_repo(GITHUB_REPO)
+    file_path, file_content = get_breakglass_file(repo, team_name)
+    team_config = get_team_config(team_name) or {}
+    manager_email = team_config.get('manager_email')
+    context = build_pipeline_context(
+        team_config, file_path, file_content.decoded_content.decode(), file_content.sha,
+        repo.get_branch("master").commit.sha,
+        get_account_id(get_thread_jira_client(), manager_email) if manager_email else None,
+    )
+
+    # Each email moves through its own PR -> Jira -> PR link stages, overlapping with the others
+    with ThreadPoolExecutor(max_workers=PIPELINE_MAX_WORKERS) as executor:
+        results = list(executor.map(lambda email: process_email(email, team_name, context, report_progress), emails))
+    return summarise_results(results)
 
 
 def confirm_prod_access(team_name, team_email_lists, slack_client, slack_channel, payload):
+    progress_ts = post_progress_message(team_name, slack_client, slack_channel)
+    reporter = None
+    prs = None
     try:
-        breakglass_emails = team_email_lists.get(team_name, get_emails_from_github(team_name))
-        
-        # Create PRs first
-        github_result = update_github_and_create_pr(team_name, breakglass_emails)
-        
-        if github_result["success"]:
-            # Create Jira tickets, passing PR information
-            jira_result = create_jira_tickets(breakglass_emails, team_name, github_result["prs"])
-            
-            if jira_result["success"]:
-                # Update PRs with Jira ticket links
-                g = Github(GITHUB_TOKEN)
-                repo = g.get_repo(GITHUB_REPO)
-                for ticket in jira_result["tickets"]:
-                    jira_link = f"{JIRA_SERVER}/browse/{ticket['key']}"
-                    update_pr_with_jira_link(repo, ticket["pr_number"], jira_link)
-                
-                pr_links = [pr['link'] for pr in github_result['prs']]
-                pr_message = f"PRs created: {', '.join(pr_links)}"
-                
-                jira_links = [f"<{JIRA_SERVER}/browse/{ticket['key']}|{ticket['key']}>" for ticket in jira_result['tickets']]
-                jira_message = f"Jira tickets created: {', '.join(jira_links)}"
-            else:
-                pr_message = f"PRs created, but Jira ticket creation failed: {jira_result['message']}"
-                jira_message = "No Jira tickets created"
-        else:
-            pr_message = f"Failed to create PRs: {github_result['message']}"
-            jira_message = "No Jira tickets created"
+        breakglass_emails = team_email_lists.get(team_name)
+        if breakglass_emails is None:
+            breakglass_emails = get_emails_from_github(team_name)
+
+        reporter = ProgressReporter(team_name, breakglass_emails, progress_ts, slack_client, slack_channel, PROGRESS_UPDATE_INTERVAL)
+        prs, pr_message, jira_message = run_prod_access_pipeline(team_name, breakglass_emails, reporter.report)
+        reporter.finish("done")
+        # Confirmed, so the next request starts from the list in GitHub
+        team_email_lists.pop(team_name)
     
         # Post the confirmed email list message
         post_confirmed_email_list_message(team_name, breakglass_emails, pr_message, jira_message, slack_client, slack_channel)
 
     except Exception as e:
+        if reporter is not None:
+            reporter.finish("failed")
         # If an error occurs, send an error message
         slack_client.chat_postMessage(
             channel=slack_channel,
             text=f":x: An error occurred while processing production access request for team {team_name}: {str(e)}"
         )
         current_app.logger.error(f"Error in confirm_prod_access: {str(e)}")
+        if not prs:
+            # Nothing was created, so re-raise to release the action flight and let the user click Confirm again
+            raise
 
 def send_pr_approved_message(pr_number, pr_title, pr_url, approver, slack_client, slack_channel):
     try:
-        message = f":white_check_mark: Pull Request #{pr_number} has been approved!\n" \
-                  f"*Title:* {pr_title}\n" \
-                  f"*Approved by:* {approver}\n" \
-                  f"*PR Link:* <{pr_url}|View PR>"
-
         slack_client.chat_postMessage(
             channel=slack_channel,
-            text=message,
-            blocks=[
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": message
-                    }
-                }
-            ]
+            **build_pr_approved_message(pr_number, pr_title, pr_url, approver)
         )
         logger.info(f"Sent PR approved message for PR #{pr_number}")
     except Exception as e:
@@ -1,39 +1,26 @@
+import json
 from flask import jsonify
 from slack_sdk.models.views import View
 from slack_sdk.models.blocks import InputBlock, SectionBlock, ActionsBlock
-from slack_sdk.models.blocks.block_elements import SelectElement, ButtonElement
-from slack_sdk.models.views import View
-from slack_sdk.models.blocks.basic_components import PlainTextObject, Option, OptionGroup
+from slack_sdk.models.blocks.block_elements import ExternalDataSelectElement, ButtonElement
+from slack_sdk.models.blocks.basic_components import PlainTextObject
 from slack_sdk.errors import SlackApiError
+from config import TEAM_SEARCH_MAX_RESULTS, TEAM_SEARCH_MIN_QUERY_LENGTH
 from utils import logger
 
-from github_handlers import get_emails_from_github, get_team_folders
+from github_handlers import get_emails_from_github
 
 def get_team_selection_view() -> View:
-    team_folders = get_team_folders()
-    
-    # Group teams alphabetically
-    team_groups = {}
-    for team in team_folders:
-        first_letter = team[0].upper()
-        if first_letter not in team_groups:
-            team_groups[first_letter] = []
-        team_groups[first_letter].append(team)
-    
-    # Create option groups
-    option_groups = []
-    for letter, teams in sorted(team_groups.items()):
-        options = [Option(text=PlainTextObject(text=team), value=team) for team in teams]
-        option_groups.append(OptionGroup(label=PlainTextObject(text=letter), options=options[:100]))
-    
+    # Options are loaded on demand from /slack/team_search, so the view does not
+    # depend on the team list and can be built once and reused.
     blocks = [
         InputBlock(
             block_id="team_name",
             label=PlainTextObject(text="Select Team"),
-            element=SelectElement(
-                placeholder=PlainTextObject(text="Choose a team"),
-                option_groups=option_groups,
-                action_id="team_name_select"
+            element=ExternalDataSelectElement(
+                placeholder=PlainTextObject(text="Start typing a team name"),
+                action_id="team_name_select",
+                min_query_length=TEAM_SEARCH_MIN_QUERY_LENGTH
             )
         )
     ]
@@ -47,6 +34,178 @@ def get_team_selection_view() -> View:
         blocks=blocks
     )
 
+# Serialised once at import time; views_open accepts the JSON-encoded view as-is
+TEAM_SELECTION_VIEW_JSON = json.dumps(get_team_selection_view().to_dict(), separators=(",", ":"))
+
+def build_team_options(all_teams, query):
+    query = query.lower()
+    matching_teams = [team for team in all_teams if query in team.lower()]
+    return [
+        {
+            "text": {"type": "plain_text", "text": team},
+            "value": team
+        }
+        for team in matching_teams[:TEAM_SEARCH_MAX_RESULTS]
+    ]
+
+def build_edit_modal_view(team_name, emails):
+    return {
+        "type": "modal",
+        "callback_id": "edit_people_modal",
+        "title": {"type": "plain_text", "text": "Edit People"},
+        "submit": {"type": "plain_text", "text": "Submit"},
+        "close": {"type": "plain_text", "text": "Cancel"},
+        "private_metadata": team_name,
+        "blocks": [
+            {
+                "type": "input",
+                "block_id": "email_list",
+                "element": {
+                    "type": "plain_text_input",
+                    "action_id": "email_input",
+                    "multiline": True,
+                    "initial_value": "\n".join(emails)
+                },
+                "label": {"type": "plain_text", "text": "Edit email list (one per line)"}
+            }
+        ]
+    }
+
+def build_email_list_message(team_name, emails):
+    email_list = "\n• ".join(emails)
+    return {
+        "text": f"Please confirm the following people for next week's production access for team {team_name}:\n{email_list}",
+        "blocks": [
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": f"Who will have production access next week for team *{team_name}*?\n\n*People for next week's production access:*\n• {email_list}"
+                }
+            },
+            {
+                "type": "actions",
+                "elements": [
+                    {
+                        "type": "button",
+                        "text": {
+                            "type": "plain_text",
+                            "text": "Confirm"
+                        },
+                        "style": "primary",
+                        "action_id": "confirm_prod_access"
+                    },
+                    {
+                        "type": "button",
+                        "text": {
+                            "type": "plain_text",
+                            "text": "Edit People"
+                        },
+                        "action_id": "edit_people"
+                    }
+                ]
+            }
+        ],
+        "metadata": {"event_type": "prod_access_request", "event_payload": {"team_name": team_name}}
+    }
+
+def build_confirmed_email_list_message(team_name, emails, pr_message, jira_message):
+    email_list = "\n• ".join([f"<mailto:{email}|{email}>" for email in emails])
+    return {
+        "text": f"Confirmed updated email list for team {team_name}",
+        "blocks": [
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": f"Confirmed updated email list for team *{team_name}*, waiting for manager's approval :clock1::\n\n• {email_list}"
+                }
+            },
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": pr_message
+                }
+            },
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": jira_message
+                }
+            }
+        ],
+        "metadata": {"event_type": "prod_access_request", "event_payload": {"team_name": team_name}}
+    }
+
+def build_processing_message(team_name):
+    return {
+        "text": f"Processing production access request for team {team_name}. This may take a few moments...:hourglass_flowing_sand:"
+    }
+
+def build_progress_message(team_name, progress, outcome=None):
+    status_lines = "\n".join(f"• {email}: {status}" for email, status in progress.items())
+    if outcome == "done":
+        header = f"Finished production access request for team *{team_name}* :white_check_mark:"
+    elif outcome == "failed":
+        header = f"Production access request for team *{team_name}* stopped with an error :x:"
+    else:
+        header = f"Processing production access request for team *{team_name}* :hourglass_flowing_sand:"
+    return {
+        "text": header.replace("*", ""),
+        "blocks": [
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": f"{header}\n\n{status_lines}"
+                }
+            }
+        ]
+    }
+
+def build_duplicate_action_message(team_name):
+    return {
+        "text": f"The production access request for team {team_name} is already being processed or was just confirmed, so this click was ignored."
+    }
+
+def build_pr_approved_message(pr_number, pr_title, pr_url, approver):
+    message = f":white_check_mark: Pull Request #{pr_number} has been approved!\n" \
+              f"*Title:* {pr_title}\n" \
+              f"*Approved by:* {approver}\n" \
+              f"*PR Link:* <{pr_url}|View PR>"
+    return {
+        "text": message,
+        "blocks": [
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": message
+                }
+            }
+        ]
+    }
+
+def build_approval_digest_message(team_name, approvals):
+    approval_lines = "\n".join(
+        f"• <{approval['pr_url']}|PR #{approval['pr_number']}> {approval['pr_title']} — approved by {approval['approver']}"
+        for approval in approvals
+    )
+    return {
+        "text": f"{len(approvals)} production access PR(s) approved for team {team_name}",
+        "blocks": [
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": f":white_check_mark: *{len(approvals)}* production access PR(s) approved for team *{team_name}*\n\n{approval_lines}"
+                }
+            }
+        ]
+    }
+
 def open_edit_modal(trigger_id, team_name, team_email_lists, slack_client):
     try:
         # Try to get the most recent email list from the local cache
@@ -60,27 +219,7 @@ def open_edit_modal(trigger_id, team_name, team_email_lists, slack_client):
 
         slack_client.views_open(
             trigger_id=trigger_id,
-            view={
-                "type": "modal",
-                "callback_id": "edit_people_modal",
-                "title": {"type": "plain_text", "text": "Edit People"},
-                "submit": {"type": "plain_text", "text": "Submit"},
-                "close": {"type": "plain_text", "text": "Cancel"},
-                "private_metadata": team_name,
-                "blocks": [
-                    {
-                        "type": "input",
-                        "block_id": "email_list",
-                        "element": {
-                            "type": "plain_text_input",
-                            "action_id": "email_input",
-                            "multiline": True,
-                            "initial_value": "\n".join(emails)
-                        },
-                        "label": {"type": "plain_text", "text": "Edit email list (one per line)"}
-                    }
-                ]
-            }
+            view=build_edit_modal_view(team_name, emails)
         )
         return jsonify({"status": "success"})
     except SlackApiError as e:
@@ -90,42 +229,9 @@ def open_edit_modal(trigger_id, team_name, team_email_lists, slack_client):
 
 def post_email_list_message(team_name, emails,slack_client, slack_channel):
     try:
-        email_list = "\n• ".join(emails)
         response = slack_client.chat_postMessage(
             channel=slack_channel,
-            text=f"Please confirm the following people for next week's production access for team {team_name}:\n{email_list}",
-            blocks=[
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": f"Who will have production access next week for team *{team_name}*?\n\n*People for next week's production access:*\n• {email_list}"
-                    }
-                },
-                {
-                    "type": "actions",
-                    "elements": [
-                        {
-                            "type": "button",
-                            "text": {
-                                "type": "plain_text",
-                                "text": "Confirm"
-                            },
-                            "style": "primary",
-                            "action_id": "confirm_prod_access"
-                        },
-                        {
-                            "type": "button",
-                            "text": {
-                                "type": "plain_text",
-                                "text": "Edit People"
-                            },
-                            "action_id": "edit_people"
-                        }
-                    ]
-                }
-            ],
-            metadata={"event_type": "prod_access_request", "event_payload": {"team_name": team_name}}
+            **build_email_list_message(team_name, emails)
         )
         logger.debug(f"Posted email list message: {response}")
         return {"response_action": "clear"}
@@ -136,37 +242,50 @@ def post_email_list_message(team_name, emails,slack_client, slack_channel):
 
 def post_confirmed_email_list_message(team_name, emails, pr_message, jira_message, slack_client, slack_channel):
     try:
-        email_list = "\n• ".join([f"<mailto:{email}|{email}>" for email in emails])
         response = slack_client.chat_postMessage(
             channel=slack_channel,
-            text=f"Confirmed updated email list for team {team_name}",
-            blocks=[
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": f"Confirmed updated email list for team *{team_name}*, waiting for manager's approval :clock1::\n\n• {email_list}"
-                    }
-                },
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": pr_message
-                    }
-                },
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": jira_message
-                    }
-                }
-            ],
-            metadata={"event_type": "prod_access_request", "event_payload": {"team_name": team_name}}
+            **build_confirmed_email_list_message(team_name, emails, pr_message, jira_message)
         )
         logger.debug(f"Posted confirmed email list message: {response}")
         return jsonify({"response_action": "clear"})
     except SlackApiError as e:
         logger.error(f"Error posting confirmed email list message: {e}")
-        return jsonify({"response_action": "errors", "errors": {"email_list": "Failed to confirm email list"}})
\ No newline at end of file
+        return jsonify({"response_action": "errors", "errors": {"email_list": "Failed to confirm email list"}})
+
+def post_progress_message(team_name, slack_client, slack_channel):
+    try:
+        response = slack_client.chat_postMessage(
+            channel=slack_channel,
+            **build_processing_message(team_name)
+        )
+        return response["ts"]
+    except SlackApiError as e:
+        logger.error(f"Error posting progress message: {e}")
+        return None
+
+
+def update_progress_message(team_name, progress, ts, slack_client, slack_channel, outcome=None):
+    if ts is None:
+        return
+    try:
+        slack_client.chat_update(
+            channel=slack_channel,
+            ts=ts,
+            **build_progress_message(team_name, progress, outcome)
+        )
+    except SlackApiError as e:
+        logger.error(f"Error updating progress message: {e}")
+
+
+def post_duplicate_action_notice(team_name, user_id, slack_client, slack_channel):
+    # Only the user who clicked sees this; without it a suppressed click looks like nothing happened
+    if not user_id:
+        return
+    try:
+        slack_client.chat_postEphemeral(
+            channel=slack_channel,
+            user=user_id,
+            **build_duplicate_action_message(team_name)
+        )
+    except SlackApiError as e:
+        logger.error(f"Error posting duplicate action notice: {e}")
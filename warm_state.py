@@ -0,0 +1,260 @@
+"""Warm-state snapshot so a reused Lambda container (or restarted process) starts with warm caches.
+
+Caches are stored as named sections in one file:
+
+    header:  magic (4s) | format version (H) | index length (I)
+    index:   JSON {section: [offset into body, length, schema version]}
+    body:    one JSON object per section, {key: [saved_at, value]}
+
+The file is memory-mapped on first use and a section is only decoded when its
+cache is first read, so a cold start does not pay for sections it never touches.
+Cache writes only mark their section dirty; `flush()` writes them all at once and
+is called at the end of each request (WSGI) or periodically off the event loop (ASGI).
+
+The file is private to the user running the app: its directory and the file
+itself are only used when owned by that user and not writable by anyone else.
+"""
+import contextlib
+import json
+import mmap
+import os
+import secrets
+import stat
+import struct
+import threading
+import time
+from config import SNAPSHOT_DIR
+from utils import logger
+
+MAGIC = b"PAMW"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHI")
+SNAPSHOT_FILE = "pam-warm-state.snap"
+
+
+def _is_private(st):
+    """True if owned by the current user and not writable by group or others."""
+    return st.st_uid == os.getuid() and not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def _ensure_private_dir(directory):
+    """Create directory with mode 0700 if needed; True if it is safe to keep the snapshot in."""
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        st = os.lstat(directory)
+    except OSError as e:
+        logger.warning(f"Warm-state snapshot disabled, cannot use {directory}: {e}")
+        return False
+    if not stat.S_ISDIR(st.st_mode) or not _is_private(st):
+        logger.warning(f"Warm-state snapshot disabled, {directory} is not a private directory owned by this user")
+        return False
+    return True
+
+
+class WarmStateSnapshot:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mmap = None
+        self._index = None
+        self._body_start = 0
+        # Decoded sections: name -> (schema version, entries)
+        self._sections = {}
+        # Caches changed since the last flush: section name -> TtlCache
+        self._dirty = {}
+        # Serialises flushes so two writers cannot interleave
+        self._flush_lock = threading.Lock()
+
+    def _open(self):
+        # Caller holds self._lock
+        if self._index is not None:
+            return
+        self._index = {}
+        if not self.path:
+            return
+        if not _ensure_private_dir(os.path.dirname(self.path)):
+            self.path = None
+            return
+        try:
+            fd = os.open(self.path, os.O_RDONLY | os.O_NOFOLLOW)
+            try:
+                if not _is_private(os.fstat(fd)):
+                    # Anyone else able to write it could choose what the caches contain
+                    logger.warning(f"Ignoring warm-state snapshot {self.path} not privately owned by this user")
+                    return
+                self._mmap = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+            finally:
+                os.close(fd)
+            magic, version, index_length = HEADER.unpack_from(self._mmap, 0)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                logger.info(f"Ignoring warm-state snapshot {self.path} with format version {version}")
+                return
+            self._body_start = HEADER.size + index_length
+            self._index = json.loads(self._mmap[HEADER.size:self._body_start])
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"Ignoring unreadable warm-state snapshot {self.path}: {e}")
+            self._index = {}
+
+    def _raw_section(self, name):
+        # Caller holds self._lock and has called _open
+        offset, length, schema_version = self._index[name]
+        start = self._body_start + offset
+        return schema_version, self._mmap[start:start + length]
+
+    def load_section(self, name, schema_version):
+        """Return the saved entries for a section, or {} if absent or from another schema version."""
+        with self._lock:
+            if name in self._sections:
+                version, entries = self._sections[name]
+                return dict(entries) if version == schema_version else {}
+            self._open()
+            if name not in self._index:
+                return {}
+            try:
+                version, raw = self._raw_section(name)
+                entries = json.loads(raw) if version == schema_version else {}
+            except (ValueError, IndexError) as e:
+                logger.warning(f"Ignoring unreadable warm-state section {name}: {e}")
+                entries = {}
+            self._sections[name] = (schema_version, entries)
+            return dict(entries)
+
+    def mark_dirty(self, cache):
+        """Record that a cache changed; it is written on the next flush()."""
+        if not self.path:
+            return
+        with self._lock:
+            self._dirty[cache.section] = cache
+
+    def flush(self):
+        """Write every cache changed since the last flush, if any, in one file write."""
+        with self._flush_lock:
+            with self._lock:
+                dirty, self._dirty = self._dirty, {}
+            if not dirty:
+                return
+            # Exported outside self._lock; a cache takes only its own lock
+            exported = {name: cache.export() for name, cache in dirty.items()}
+
+            with self._lock:
+                self._sections.update(exported)
+                self._open()
+
+                # Sections that were never decoded are copied across as raw bytes
+                payloads = {section: (version, json.dumps(data, separators=(",", ":")).encode())
+                            for section, (version, data) in self._sections.items()}
+                for section in self._index:
+                    if section not in payloads:
+                        payloads[section] = self._raw_section(section)
+
+                self._write(payloads)
+
+    def _write(self, payloads):
+        # Caller holds self._lock
+        index = {}
+        offset = 0
+        for section, (version, payload) in payloads.items():
+            index[section] = [offset, len(payload), version]
+            offset += len(payload)
+        index_bytes = json.dumps(index, separators=(",", ":")).encode()
+
+        tmp_path = f"{self.path}.{os.getpid()}.{secrets.token_hex(4)}.tmp"
+        try:
+            # O_EXCL and O_NOFOLLOW so a planted file or symlink is never written through
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_NOFOLLOW, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(index_bytes)))
+                f.write(index_bytes)
+                for section in index:
+                    f.write(payloads[section][1])
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not write warm-state snapshot {self.path}: {e}")
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+            return
+
+        # Re-map lazily so raw copies of undecoded sections come from the new file
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._index = None
+
+
+snapshot = WarmStateSnapshot(os.path.join(SNAPSHOT_DIR, SNAPSHOT_FILE) if SNAPSHOT_DIR else None)
+
+
+class TtlCache:
+    """A keyed cache whose entries expire after `ttl` seconds and survive restarts via the snapshot.
+
+    Supports `get`, `pop` and item assignment so it can stand in for a plain dict.
+    With `store=None` the cache is kept in memory only.
+    """
+
+    def __init__(self, section, ttl, schema_version=1, store=snapshot):
+        self.section = section
+        self.ttl = ttl
+        self.schema_version = schema_version
+        self.store = store
+        self._entries = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        # Caller holds self._lock; restored lazily on first access
+        if self._entries is None:
+            self._entries = self.store.load_section(self.section, self.schema_version) if self.store is not None else {}
+
+    def _is_fresh(self, saved_at, now):
+        return self.ttl is None or now - saved_at < self.ttl
+
+    def get(self, key, default=None):
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+        if entry is None or not self._is_fresh(entry[0], time.time()):
+            return default
+        return entry[1]
+
+    def get_stale(self, key, default=None):
+        """Return the last saved value even if it has expired."""
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+        return default if entry is None else entry[1]
+
+    def keys(self):
+        """Return the keys of the entries that have not expired."""
+        now = time.time()
+        with self._lock:
+            self._load()
+            return [k for k, entry in self._entries.items() if self._is_fresh(entry[0], now)]
+
+    def set(self, key, value):
+        with self._lock:
+            self._load()
+            self._entries[key] = [time.time(), value]
+        if self.store is not None:
+            self.store.mark_dirty(self)
+
+    __setitem__ = set
+
+    def pop(self, key, default=None):
+        with self._lock:
+            self._load()
+            entry = self._entries.pop(key, None)
+        if entry is None:
+            return default
+        if self.store is not None:
+            self.store.mark_dirty(self)
+        return entry[1]
+
+    def export(self):
+        """Return (schema version, fresh entries) for writing to the snapshot."""
+        now = time.time()
+        with self._lock:
+            self._load()
+            # Drop expired entries so the snapshot does not grow without bound
+            self._entries = {k: entry for k, entry in self._entries.items() if self._is_fresh(entry[0], now)}
+            return self.schema_version, dict(self._entries)